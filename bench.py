@@ -0,0 +1,291 @@
+"""
+Benchmarks for Stilted.
+
+Run all of them, or just some by name:
+
+    $ python bench.py [name ...]
+
+"""
+
+import concurrent.futures
+import pathlib
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from evaluate import Engine
+from extension import Extension
+from globalvm import GlobalVM
+from spool import run_workers
+
+
+BENCHMARKS: dict[str, Callable[[], float]] = {}
+
+def benchmark(func: Callable[[], float]) -> Callable[[], float]:
+    """Register a benchmark function. It returns a time in seconds."""
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def best_time(text: str, setup: str="", repeat: int=5, **engine_kwargs) -> float:
+    """Run `text` in a fresh Engine `repeat` times, returning the best time."""
+    times = []
+    for _ in range(repeat):
+        engine = Engine(**engine_kwargs)
+        engine.exec_text(setup)
+        start = time.perf_counter()
+        engine.exec_text(text)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+@benchmark
+def proc_calls() -> float:
+    """Call small procedures many times."""
+    return best_time(
+        "20000 { p q } repeat",
+        setup="/p { } def /q { 1 pop } def",
+    )
+
+
+TEMPLATE = """
+    (/x 10 def /y 20 def x y add x y mul x y sub 3 { pop } repeat)
+    cvx /template exch def
+"""
+
+@benchmark
+def exec_string() -> float:
+    """Execute the same executable string many times."""
+    return best_time("2000 { template } repeat", setup=TEMPLATE)
+
+@benchmark
+def exec_string_uncached() -> float:
+    """Execute the same executable string many times, with no text cache."""
+    return best_time("2000 { template } repeat", setup=TEMPLATE, text_cache_size=0)
+
+
+@benchmark
+def stopped_errors() -> float:
+    """A `stopped` loop where half of the iterations fail."""
+    return best_time(
+        "0 1 2000 { { f } stopped pop clear } for",
+        setup="/f { 2 mod 0 eq { 1 (a) add } { 1 2 add } ifelse } def",
+    )
+
+
+@benchmark
+def marks() -> float:
+    """Find marks on a deep operand stack."""
+    return best_time("[ 1 1 3000 { counttomark } for ] pop")
+
+
+@benchmark
+def big_roll() -> float:
+    """Roll many elements on the operand stack."""
+    return best_time(
+        "200 { 20000 7 roll 20000 -3 roll } repeat",
+        setup="0 1 20000 { } for",
+    )
+
+
+@benchmark
+def bulk_copy() -> float:
+    """Copy and store big strings and arrays."""
+    return best_time(
+        "10 { s1 s2 copy pop s2 1 s1 0 999999 getinterval putinterval"
+        + " a1 a2 copy pop a1 aload a2 astore pop pop } repeat",
+        setup=(
+            "/s1 1000000 string def /s2 1000000 string def"
+            + " /a1 100000 array def /a2 100000 array def"
+        ),
+    )
+
+
+MANDELBROT = """
+/mandel {           % cx cy -> iterations
+    /cy exch def /cx exch def
+    0.0 0.0 0       % x y n
+    {
+        dup 30 ge { exit } if
+        3 1 roll                            % n x y
+        2 copy dup mul exch dup mul         % n x y y^2 x^2
+        2 copy add 4 gt { pop pop 3 -1 roll exit } if
+        exch sub cx add                     % n x y x'
+        3 1 roll mul 2 mul cy add           % n x' y'
+        3 -1 roll 1 add
+    } loop
+    3 1 roll pop pop
+} bind def
+"""
+
+@benchmark
+def mandelbrot() -> float:
+    """Arithmetic on integers and reals: compute a small Mandelbrot set."""
+    return best_time(
+        "0 -1.0 0.1 1.0 { /y exch def -2.0 0.1 0.5 { y mandel add } for } for pop",
+        setup=MANDELBROT,
+    )
+
+
+POINTS = "/xs [ 0 1 9999 { } for ] def"
+
+@benchmark
+def scale_forall() -> float:
+    """Scale and sum many coordinates one at a time."""
+    return best_time("10 { 0 xs { 72 mul 36 add add } forall pop } repeat", setup=POINTS)
+
+@benchmark
+def scale_vector() -> float:
+    """Scale and sum many coordinates with vector operators."""
+    return best_time(
+        "10 { xs .tovector 72 .vmul 36 .vadd .vsum pop } repeat",
+        setup=POINTS,
+    )
+
+
+@benchmark
+def matrix_ops() -> float:
+    """Use the same matrix arrays over and over."""
+    return best_time(
+        "3000 { 1 2 m itransform m transform pop pop m setmatrix c currentmatrix pop } repeat",
+        setup="/m 30 matrix rotate def /c matrix def",
+    )
+
+
+POLYLINE = "/m 30 matrix rotate def /pts [ 0 1 1999 { dup 2 mul } for ] def"
+
+@benchmark
+def transform_each() -> float:
+    """Transform the points of a polyline one at a time."""
+    return best_time(
+        "[ pts aload pop 2000 { m itransform 4000 2 roll } repeat ] pop",
+        setup=POLYLINE,
+    )
+
+@benchmark
+def transform_points() -> float:
+    """Transform the points of a polyline all at once."""
+    return best_time("pts m .itransformpoints pop", setup=POLYLINE)
+
+
+PROLOGUE = "".join(
+    f"/p{i} {{ {i} add dup mul 2 div [ 1 2 3 ] aload pop pop pop (p{i}) pop }} bind def\n"
+    for i in range(500)
+)
+
+def best_job_time(job: Callable[[], None], repeat: int=20) -> float:
+    """Run `job` `repeat` times, returning the best time."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        job()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+@benchmark
+def prologue_each_job() -> float:
+    """Start a job that runs its own copy of a prologue."""
+    def job() -> None:
+        engine = Engine()
+        engine.exec_text(PROLOGUE + "1 p7 pop")
+    return best_job_time(job)
+
+@benchmark
+def prologue_shared() -> float:
+    """Start a job that finds a prologue already loaded in global VM."""
+    vm = GlobalVM()
+    Engine(global_vm=vm).exec_text(
+        "true setglobal /Prolog 500 dict begin " + PROLOGUE
+        + " currentdict end /ProcSet defineresource pop"
+    )
+    def job() -> None:
+        engine = Engine(global_vm=vm)
+        engine.exec_text("/Prolog /ProcSet findresource begin 1 p7 pop")
+    return best_job_time(job)
+
+
+JOIN_PS = """
+/join {             % sep [strings] -> string
+    /strs exch def /sep exch def
+    strs length 1 sub sep length mul
+    strs { length add } forall
+    string 0 strs {                         % result pos str
+        3 copy putinterval length add
+        dup 2 index length lt { 2 copy sep putinterval sep length add } if
+    } forall
+    pop
+} bind def
+/cells [ 0 1 99 { 10 string cvs } for ] def
+"""
+
+benchext = Extension("benchext")
+
+@benchext.py_operator
+def join(sep: bytes, items: list) -> bytes:
+    return sep.join(items)
+
+@benchmark
+def join_ps() -> float:
+    """Join strings with a procedure written in PostScript."""
+    return best_time("300 { (, ) cells join pop } repeat", setup=JOIN_PS)
+
+@benchmark
+def join_extension() -> float:
+    """Join strings with an extension operator written in Python."""
+    return best_time(
+        "benchext begin 300 { (, ) cells join pop } repeat end",
+        setup=JOIN_PS,
+        extensions=[benchext],
+    )
+
+
+def run_jobs(n_threads: int, n_jobs: int=16) -> float:
+    """Run `n_jobs` small jobs, each in its own Engine, on `n_threads` threads."""
+    def job(n: int) -> None:
+        engine = Engine()
+        engine.exec_text(f"/n {n} def 0 1 1 3000 {{ n mul add }} for pop")
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(n_threads) as executor:
+        list(executor.map(job, range(n_jobs)))
+    return time.perf_counter() - start
+
+@benchmark
+def engines_1_thread() -> float:
+    """Run many engines one after another."""
+    return min(run_jobs(1) for _ in range(5))
+
+@benchmark
+def engines_4_threads() -> float:
+    """Run many engines on four threads."""
+    return min(run_jobs(4) for _ in range(5))
+
+
+def spool_jobs(n_workers: int, n_jobs: int=32) -> float:
+    """Render `n_jobs` spooled jobs with `n_workers` worker processes."""
+    with tempfile.TemporaryDirectory() as spool:
+        for n in range(n_jobs):
+            job = f"/n {n} def 0 1 1 2000 {{ n mul add }} for pop showpage"
+            pathlib.Path(spool, f"job{n}.ps").write_text(job)
+        start = time.perf_counter()
+        run_workers(n_workers, once=True, spool=spool)
+        return time.perf_counter() - start
+
+@benchmark
+def spool_1_worker() -> float:
+    """Render spooled jobs with one worker process."""
+    return spool_jobs(1)
+
+@benchmark
+def spool_4_workers() -> float:
+    """Render spooled jobs with four worker processes."""
+    return spool_jobs(4)
+
+
+def main(names: list[str]) -> None:
+    for name in names or BENCHMARKS:
+        secs = BENCHMARKS[name]()
+        print(f"{name:20} {secs * 1000:10.2f} ms")
+
+if __name__ == "__main__":          # pragma: no cover
+    main(sys.argv[1:])
@@ -1,8 +1,10 @@
 """Cairo utilities for Stilted."""
 
+from dataclasses import dataclass
+
 import cairo
 
-from dtypes import from_py, Array
+from dtypes import Array, Real
 from error import Tilted
 from evaluate import Engine
 
@@ -13,13 +15,71 @@ def has_current_point(engine: Engine) -> None:
         raise Tilted("nocurrentpoint")
 
 
+@dataclass
+class MatrixCache:
+    """The Cairo matrices for a matrix array, cached with the array."""
+    matrix: cairo.Matrix
+    inverse: cairo.Matrix | None = None
+
+
 def cmatrix_to_array(mtx: cairo.Matrix, arr: Array):
-    """Assign mtx into arr."""
-    lmtx = list(mtx) # type: ignore
-    for i in range(6):
-        arr[i] = from_py(lmtx[i])
+    """
+    Assign mtx into arr.
+
+    `mtx` is cached with the array, so don't change it afterward.
+    """
+    arr.put_contents(0, [Real(True, v) for v in mtx])    # type: ignore
+    arr.set_cache(MatrixCache(mtx))
+
+
+def cmatrix_to_new_array(engine: Engine, mtx: cairo.Matrix) -> Array:
+    """
+    Make a new Array from a Matrix.
+
+    `mtx` is cached with the array, so don't change it afterward.
+    """
+    arr = engine.new_array(value=[Real(True, v) for v in mtx])    # type: ignore
+    arr.set_cache(MatrixCache(mtx))
+    return arr
+
+
+def matrix_cache(arr: Array) -> MatrixCache:
+    """Get the MatrixCache for an array, making it if needed."""
+    cache = arr.get_cache()
+    if not isinstance(cache, MatrixCache):
+        cache = MatrixCache(cairo.Matrix(*arr.numbers()))
+        arr.set_cache(cache)
+    return cache
 
 
 def array_to_cmatrix(arr) -> cairo.Matrix:
-    """Convert an Array into a Matrix."""
-    return cairo.Matrix(*map(lambda o: o.value, arr))
+    """
+    Convert an Array into a Matrix.
+
+    The Matrix is cached with the array, so don't change it.  Use
+    `array_to_new_cmatrix` to get one you can change.
+    """
+    return matrix_cache(arr).matrix
+
+
+def array_to_new_cmatrix(arr) -> cairo.Matrix:
+    """Convert an Array into a new Matrix, which the caller can change."""
+    return cairo.Matrix(*matrix_cache(arr).matrix)
+
+
+def array_to_inverse_cmatrix(arr) -> cairo.Matrix:
+    """
+    Convert an Array into the inverse of its Matrix.
+
+    Raises undefinedresult if the matrix can't be inverted.  The inverse is
+    cached with the array, so don't change it.
+    """
+    cache = matrix_cache(arr)
+    if cache.inverse is None:
+        inverse = cairo.Matrix(*cache.matrix)
+        try:
+            inverse.invert()
+        except cairo.Error:
+            raise Tilted("undefinedresult")
+        cache.inverse = inverse
+    return cache.inverse
@@ -0,0 +1,174 @@
+"""
+Checkpointing a running Engine to disk, and resuming it later.
+
+A checkpoint is a compressed pickle of the Engine. Stilted objects are plain
+data, but a few things need help:
+
+- Operators are pickled by name, and found again in SYSTEMDICT.  Extension
+  operators are pickled with their Extension, which is pickled as the
+  "module:name" it can be imported from, so it has to be defined at the top
+  level of a module.
+
+- MARK and NULL are singletons, and stay that way.
+
+- PyCairo objects can't be pickled. Matrices and paths are converted to
+  tuples and lists of segments. The current Cairo graphics state is saved as
+  a SavedGstate, and restored to the new device's context.
+
+- The output device is re-created from its class, file name, size, and page
+  number.
+
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import pickle
+import sys
+import zlib
+from typing import Any
+
+import cairo
+
+from device import Device
+from dtypes import MARK, NULL, Operator
+from evaluate import Engine, LazyOperator, SYSTEMDICT
+from extension import Extension, load_extension
+from gstate import SavedGstate
+
+
+def save_checkpoint(engine: Engine, filename: str) -> None:
+    """Write the state of `engine` to `filename`."""
+    state = {
+        "engine": engine,
+        "gstate": SavedGstate.from_ctx(
+            from_save=False, ctx=engine.gctx, extra=engine.gextra,
+        ),
+    }
+    buffer = io.BytesIO()
+    CheckpointPickler(buffer, engine, protocol=pickle.HIGHEST_PROTOCOL).dump(state)
+    # Write to a temporary file and rename, so that a crash while writing
+    # doesn't destroy the previous checkpoint.
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(zlib.compress(buffer.getvalue()))
+    os.replace(tmp_filename, filename)
+
+
+def load_checkpoint(filename: str, stdout=None) -> Engine:
+    """
+    Read an Engine from a checkpoint in `filename`.
+
+    Call `engine.run()` to continue execution where it was checkpointed.
+    """
+    with open(filename, "rb") as f:
+        state = pickle.loads(zlib.decompress(f.read()))
+    engine = state["engine"]
+    if stdout is not None:
+        engine.stdout = stdout
+    state["gstate"].restore_to_ctx(engine.gctx, engine)
+    return engine
+
+
+class CheckpointPickler(pickle.Pickler):
+    """A pickler that knows how to save the un-picklable parts of an Engine."""
+
+    def __init__(self, file: io.BytesIO, engine: Engine, **kwargs: Any) -> None:
+        super().__init__(file, **kwargs)
+        # The extensions of extension operators, keyed by the id of the
+        # operator function.
+        self.ext_ops = {
+            id(op.value): (ext, name)
+            for ext in engine.extensions
+            for name, op in ext.operators.items()
+        }
+
+    def reducer_override(self, obj: Any) -> Any:
+        if obj is MARK:
+            return (singleton, ("MARK",))
+        elif obj is NULL:
+            return (singleton, ("NULL",))
+        elif isinstance(obj, Operator):
+            if id(obj.value) in self.ext_ops:
+                ext, name = self.ext_ops[id(obj.value)]
+                return (find_ext_operator, (ext, name, obj.literal))
+            builtin = SYSTEMDICT.get(obj.name)
+            if not (
+                isinstance(builtin, Operator)
+                and (builtin.value is obj.value or isinstance(obj.value, LazyOperator))
+            ):
+                raise pickle.PicklingError(
+                    f"Can't checkpoint operator {obj.name!r}: it isn't built in or from an extension"
+                )
+            return (find_operator, (obj.name, obj.literal))
+        elif isinstance(obj, Extension):
+            return (load_extension, (extension_spec(obj),))
+        elif isinstance(obj, Device):
+            return (
+                make_device,
+                (type(obj), obj.outfile, (obj.width, obj.height), obj.page_num),
+            )
+        elif isinstance(obj, cairo.Matrix):
+            return (cairo.Matrix, tuple(obj))     # type: ignore
+        elif isinstance(obj, cairo.Path):
+            segments = [(int(kind), tuple(points)) for kind, points in obj]
+            return (make_path, (segments,))
+        elif isinstance(obj, int) and type(obj).__module__ == "cairo":
+            # Cairo enums like LineCap.
+            return (type(obj), (int(obj),))
+        return NotImplemented
+
+
+def singleton(name: str) -> Any:
+    """Find a singleton object when unpickling."""
+    return {"MARK": MARK, "NULL": NULL}[name]
+
+
+def find_operator(name: str, literal: bool) -> Operator:
+    """Find a built-in operator when unpickling."""
+    op = SYSTEMDICT[name]
+    assert isinstance(op, Operator)
+    if op.literal != literal:
+        op = Operator(literal=literal, value=op.value, name=op.name)
+    return op
+
+
+def find_ext_operator(ext: Extension, name: str, literal: bool) -> Operator:
+    """Find an extension's operator when unpickling."""
+    op = ext.operators[name]
+    if op.literal != literal:
+        op = Operator(literal=literal, value=op.value, name=op.name)
+    return op
+
+
+def extension_spec(ext: Extension) -> str:
+    """Find the "module:name" that `ext` can be imported from."""
+    for modname, module in list(sys.modules.items()):
+        for attr, value in list(getattr(module, "__dict__", {}).items()):
+            if value is ext:
+                return f"{modname}:{attr}"
+    raise pickle.PicklingError(f"Can't checkpoint {ext!r}: it isn't defined in a module")
+
+
+def make_device(cls: type[Device], outfile: str, size: tuple[int, int], page_num: int) -> Device:
+    """Re-create an output device when unpickling."""
+    device = cls(outfile, size)
+    device.page_num = page_num
+    return device
+
+
+def make_path(segments: list[tuple[int, tuple[float, ...]]]) -> cairo.Path:
+    """Re-create a Cairo path from its segments when unpickling."""
+    ctx = cairo.Context(cairo.ImageSurface(cairo.Format.RGB24, 1, 1))
+    for kind, points in segments:
+        match kind:
+            case cairo.PathDataType.MOVE_TO:
+                ctx.move_to(*points)
+            case cairo.PathDataType.LINE_TO:
+                ctx.line_to(*points)
+            case cairo.PathDataType.CURVE_TO:
+                ctx.curve_to(*points)
+            case cairo.PathDataType.CLOSE_PATH:
+                ctx.close_path()
+    return ctx.copy_path()
@@ -5,7 +5,9 @@ import pathlib
 import sys
 from typing import Callable
 
+from dtypes import Name
 from evaluate import Engine
+from extension import find_extensions
 
 
 def main(argv: list[str], input_fn: Callable[[str], str]=input) -> int:
@@ -29,35 +31,56 @@ def main(argv: list[str], input_fn: Callable[[str], str]=input) -> int:
         "-s", dest="size", metavar="WxH", default="612x792",
         help="The size of the output, WIDTHxHEIGHT, in points",
     )
+    parser.add_argument(
+        "--ext", metavar="MODULE:NAME", action="append", default=[],
+        help="Load an extension, as well as installed ones (repeatable)",
+    )
+    parser.add_argument(
+        "--checkpoint", metavar="FILE",
+        help="Write a checkpoint to FILE at every showpage",
+    )
+    parser.add_argument(
+        "--resume", metavar="FILE",
+        help="Resume execution from a checkpoint FILE",
+    )
     parser.add_argument("args", nargs="*")
 
     args = parser.parse_args(argv)
 
     code = None
+    in_argv = [""]
     if args.code is not None:
         code = args.code
         in_argv = ["-c"] + args.args
     elif args.args:
         code = pathlib.Path(args.args[0]).read_text()
         in_argv = args.args
-    else:
+    elif args.resume is None:
         args.interactive = True
-        in_argv = [""]
 
     size = None
     if args.size:
         size = tuple(map(int, args.size.split("x")))
 
-    engine = Engine(outfile=args.outfile, size=size)
+    if args.resume is not None:
+        from checkpoint import load_checkpoint
+        engine = load_checkpoint(args.resume)
+        engine.checkpoint_file = args.checkpoint
+        engine.run()
+    else:
+        engine = Engine(
+            outfile=args.outfile,
+            size=size,
+            checkpoint_file=args.checkpoint,
+            extensions=[*find_extensions(), *args.ext],
+        )
 
-    engine.exec_text("/argv [")
-    for arg in in_argv:
-        engine.push_string(arg)
-    engine.exec_text("] def")
+        arg_bytes = [arg.encode("iso8859-1") for arg in in_argv]
+        engine.call("def", Name(True, "argv"), arg_bytes)
 
-    if code is not None:
-        engine.push_string(code)
-        engine.exec_text("cvx stopped { handleerror } if")
+        if code is not None:
+            engine.push_string(code)
+            engine.exec_text("cvx stopped { handleerror } if")
 
     if args.interactive:
         while True:
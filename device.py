@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 import io
-import itertools
+from typing import Callable
 
 import cairo
 
@@ -21,26 +21,40 @@ class Device:
         self.ctx.set_source_rgb(0, 0, 0)
         self.default_matrix = self.ctx.get_matrix()
 
-        self.page_nums = itertools.count(start=1)
+        # The number of the last page written, for multi-file output.
+        self.page_num = 0
 
     @classmethod
     def from_filename(cls, outfile, size=None) -> Device:
-        if outfile.endswith(".svg"):
-            return SvgDevice(outfile, size)
-        elif outfile.endswith(".png"):
-            return PngDevice(outfile, size)
-        else:
-            raise Exception(f"Don't know how to write to {outfile!r}")
+        return device_class(outfile)(outfile, size)
 
     def make_ctx(self) -> None:
         raise NotImplementedError()
 
+    def start_output(self, outfile) -> None:
+        """Discard the current page, and start writing pages to `outfile`."""
+        assert type(self) is device_class(outfile)
+        self.outfile = outfile
+        self.page_num = 0
+        self.make_ctx()
+
     def show_page(self) -> None:
+        """Write the current page, and start a new one."""
+        self.end_page()()
+
+    def end_page(self) -> Callable[[], None]:
+        """
+        Start a new page, returning a function to write the finished one.
+
+        The function doesn't use the device, so it can be run in another
+        thread while the next page is drawn.
+        """
         raise NotImplementedError()
 
     def page_file_name(self) -> str:
         if "%" in self.outfile:
-            return self.outfile % (next(self.page_nums))
+            self.page_num += 1
+            return self.outfile % self.page_num
         else:
             return self.outfile
 
@@ -54,12 +68,18 @@ class SvgDevice(Device):
         self.ctx.translate(0, self.height)
         self.ctx.scale(1, -1)
 
-    def show_page(self) -> None:
-        self.surface.finish()
-        with open(self.page_file_name(), "wb") as page_svg:
-            page_svg.write(self.svgio.getvalue())
+    def end_page(self) -> Callable[[], None]:
+        surface, svgio = self.surface, self.svgio
+        file_name = self.page_file_name()
         self.make_ctx()
 
+        def write_page() -> None:
+            surface.finish()
+            with open(file_name, "wb") as page_svg:
+                page_svg.write(svgio.getvalue())
+
+        return write_page
+
 
 class PngDevice(Device):
     def make_ctx(self) -> None:
@@ -78,7 +98,52 @@ class PngDevice(Device):
         self.ctx.rectangle(0, 0, self.surface.get_width(), self.surface.get_height())
         self.ctx.fill()
 
-    def show_page(self) -> None:
-        self.surface.write_to_png(self.page_file_name())
-        self.surface.finish()
+    def end_page(self) -> Callable[[], None]:
+        surface = self.surface
+        file_name = self.page_file_name()
+        self.make_ctx()
+
+        def write_page() -> None:
+            surface.write_to_png(file_name)
+            surface.finish()
+
+        return write_page
+
+
+class NullDevice(Device):
+    """
+    A device for jobs whose output isn't wanted.
+
+    A recording surface doesn't rasterize anything, so drawing is cheap, and
+    what it has recorded is dropped at each page.
+    """
+    def make_ctx(self) -> None:
+        extents = cairo.Rectangle(0, 0, self.width, self.height)
+        self.surface = cairo.RecordingSurface(cairo.Content.COLOR_ALPHA, extents)
+        self.ctx = cairo.Context(self.surface)
+        self.ctx.translate(0, self.height)
+        self.ctx.scale(1, -1)
+
+    def end_page(self) -> Callable[[], None]:
+        surface = self.surface
         self.make_ctx()
+        return surface.finish
+
+
+def device_class(outfile) -> type[Device]:
+    """The Device class that writes to `outfile`."""
+    if outfile is None:
+        return NullDevice
+    elif outfile.endswith(".svg"):
+        return SvgDevice
+    elif outfile.endswith(".png"):
+        return PngDevice
+    else:
+        raise Exception(f"Don't know how to write to {outfile!r}")
+
+
+def device_change(old: Device, new: Device) -> cairo.Matrix:
+    """The matrix that maps `old`'s device space to `new`'s."""
+    change = cairo.Matrix(*old.default_matrix)
+    change.invert()
+    return change.multiply(new.default_matrix)
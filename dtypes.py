@@ -2,12 +2,13 @@
 
 from __future__ import annotations
 
+import array
 import copy
 import math
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from types import UnionType
 from typing import (
-    Any, Callable, ClassVar, Generic, Iterator, TypeVar, TYPE_CHECKING,
+    Any, Callable, ClassVar, Generic, Iterator, TypeVar, TYPE_CHECKING, cast,
 )
 
 from error import Tilted
@@ -86,6 +87,17 @@ class Real(Object):
 # For type-checking numbers.
 Number: UnionType = Integer | Real
 
+# PostScript integers are 32 bits. Integer arithmetic that overflows produces
+# a real instead.
+MIN_INT = -2**31
+MAX_INT = 2**31 - 1
+
+def int_or_real(val: int) -> Integer | Real:
+    """Make an Integer from `val`, or a Real if it's too big for an Integer."""
+    if MIN_INT <= val <= MAX_INT:
+        return Integer(True, val)
+    return Real(True, float(val))
+
 
 @dataclass
 class Boolean(Object):
@@ -185,7 +197,7 @@ class String(Object):
     length: int
 
     @classmethod
-    def from_bytes(cls, data: bytes) -> String:
+    def from_bytes(cls, data: bytes | bytearray) -> String:
         """Make a new string from a bytestring."""
         return cls(
             literal=True,
@@ -215,6 +227,15 @@ class String(Object):
     def __setitem__(self, index: int, value: int) -> None:
         self.data[self.start + index] = value
 
+    def contents(self) -> bytearray:
+        """Get a copy of the bytes in the string."""
+        return self.data[self.start: self.start + self.length]
+
+    def put_contents(self, index: int, data: bytes | bytearray) -> None:
+        """Overwrite the string with `data`, starting at `index`."""
+        start = self.start + index
+        self.data[start: start + len(data)] = data
+
     def new_sub(self, start: int, length: int) -> String:
         """Make a new string as a substring of another."""
         rangecheck(0, start, self.length)
@@ -307,13 +328,53 @@ class Null(Object):
 NULL = Null(literal=True)
 
 
+# The objects in an array are either a list of objects, or numbers stored
+# compactly in an array.array.
+ArrayData = list[Object] | array.array
+
 @dataclass
-class ArrayStorage(SaveableStorage[list[Object]]):
-    """Saveable storage for Arrays."""
+class ArrayStorage(SaveableStorage[ArrayData]):
+    """
+    Saveable storage for Arrays.
+
+    Arrays that hold only literal integers, or only literal reals, are stored
+    compactly in an array.array of "q" (64-bit integers) or "d" (reals).  If
+    anything else is stored into one, it is changed to a list of objects.
+
+    `cache` holds something computed from the array, like a Cairo matrix.
+    See Array.get_cache and Array.set_cache.
+
+    """
+    cache: Any = field(default=None, compare=False, repr=False)
+
+    @staticmethod
+    def pack(objs: list[Object]) -> ArrayData:
+        """Store `objs` compactly if they are all the same kind of number."""
+        if not objs:
+            return objs
+        if all(type(o) is Integer and o.literal for o in objs):
+            ints = [cast(Integer, o).value for o in objs]
+            if MIN_INT <= min(ints) and max(ints) <= MAX_INT:
+                return array.array("q", ints)
+        elif all(type(o) is Real and o.literal for o in objs):
+            return array.array("d", [cast(Real, o).value for o in objs])
+        return objs
+
+    def unpack(self) -> list[Object]:
+        """Change compact storage to a list of objects, and return the list."""
+        save, nums = self.values[-1]
+        assert isinstance(nums, array.array)
+        objs: list[Object]
+        if nums.typecode == "d":
+            objs = [Real(True, n) for n in nums]
+        else:
+            objs = [Integer(True, n) for n in nums]
+        self.values[-1] = (save, objs)
+        return objs
 
 
 @dataclass
-class Array(SaveableObject[list[Object]]):
+class Array(SaveableObject[ArrayData]):
     """
     An array.
 
@@ -321,8 +382,13 @@ class Array(SaveableObject[list[Object]]):
     all Arrays have `start` and `length`.  A new sub-array uses the same
     ArrayStorage, but with new `start` and `length`.
 
+    The storage might hold numbers rather than objects (see ArrayStorage), so
+    use the methods here to get and put elements rather than using `value`
+    directly.
+
     """
     typename: ClassVar[str] = "array"
+    storage: ArrayStorage
     start: int
     length: int
 
@@ -331,7 +397,7 @@ class Array(SaveableObject[list[Object]]):
         rangecheck(0, start, self.length)
         rangecheck(0, length)
         rangecheck(start + length, self.length)
-        return Array(
+        return type(self)(
             literal=True,
             storage=self.storage,
             start=self.start + start,
@@ -342,22 +408,134 @@ class Array(SaveableObject[list[Object]]):
         return self.length
 
     def __iter__(self) -> Iterator[Object]:
-        for i in range(self.start, self.start + self.length):
-            yield self.value[i]
+        return iter(self.contents())
 
     def __getitem__(self, index: int) -> Object:
-        return self.value[self.start + index]
+        values = self.value
+        if isinstance(values, list):
+            return values[self.start + index]
+        return self.box(values[self.start + index])
 
     def __setitem__(self, index: int, value: Object) -> None:
-        self.value[self.start + index] = value
+        self.storage.cache = None
+        values = self.value
+        if not isinstance(values, list):
+            num = self.unbox(value)
+            if num is not None:
+                values[self.start + index] = num
+                return
+            values = self.storage.unpack()
+        values[self.start + index] = value
+
+    def contents(self) -> list[Object]:
+        """Get a list of the elements in the array."""
+        values = self.value[self.start: self.start + self.length]
+        if isinstance(values, list):
+            return values
+        box = self.box
+        return [box(v) for v in values]
+
+    def put_contents(self, index: int, objs: list[Object]) -> None:
+        """
+        Overwrite the array with `objs`, starting at `index`.
+
+        Call `prep_for_change` first.
+        """
+        self.storage.cache = None
+        values = self.value
+        start = self.start + index
+        if not isinstance(values, list):
+            nums = list(map(self.unbox, objs))
+            if None not in nums:
+                values[start: start + len(nums)] = array.array(values.typecode, nums)  # type: ignore
+                return
+            values = self.storage.unpack()
+        values[start: start + len(objs)] = objs
+
+    def numbers(self) -> array.array:
+        """
+        Get the elements of the array as an array.array of numbers.
+
+        Raises typecheck if the array holds anything but numbers.
+        """
+        values = self.value[self.start: self.start + self.length]
+        if isinstance(values, list):
+            typecheck(Number, *values)
+            nums = cast(list[Integer | Real], values)
+            values = array.array("d", [obj.value for obj in nums])
+        return values
+
+    def get_cache(self) -> Any:
+        """Get the data saved with `set_cache`, or None if the array changed."""
+        cache = self.storage.cache
+        if (
+            cache is not None
+            and cache[0] is self.value
+            and cache[1:3] == (self.start, self.length)
+        ):
+            return cache[3]
+        return None
+
+    def set_cache(self, data: Any) -> None:
+        """Save `data` computed from this array, until the array changes."""
+        self.storage.cache = (self.value, self.start, self.length, data)
+
+    @property
+    def typecode(self) -> str | None:
+        """The typecode of the compact storage, or None for a list."""
+        values = self.value
+        return None if isinstance(values, list) else values.typecode
+
+    def box(self, num: Any) -> Integer | Real:
+        """Make a Stilted number from a number in compact storage."""
+        if self.typecode == "d":
+            return Real(True, num)
+        else:
+            return Integer(True, num)
+
+    def unbox(self, obj: Object) -> int | float | None:
+        """
+        Get a number to put into compact storage.
+
+        Returns None if `obj` can't be stored compactly.
+        """
+        if obj.literal:
+            if self.typecode == "d":
+                if isinstance(obj, Real):
+                    return obj.value
+            elif isinstance(obj, Integer) and MIN_INT <= obj.value <= MAX_INT:
+                return obj.value
+        return None
 
     def op_eqeq(self) -> str:
         eqeq = "[" if self.literal else "{"
-        eqeq += " ".join(obj.op_eqeq() for obj in self.value)
+        eqeq += " ".join(obj.op_eqeq() for obj in self)
         eqeq += "]" if self.literal else "}"
         return eqeq
 
 
+@dataclass
+class Vector(Array):
+    """
+    An array that can only hold numbers, stored compactly.
+
+    The storage is always an array.array, of 64-bit integers (typecode "q")
+    or reals (typecode "d").  Vectors work with all of the array operators,
+    but only numbers can be stored into them.
+
+    """
+    def unbox(self, obj: Object) -> int | float:
+        """Get a number that can be stored in this vector."""
+        if self.typecode == "d":
+            typecheck(Number, obj)
+            return float(cast(Integer | Real, obj).value)
+        else:
+            typecheck(Integer, obj)
+            val = cast(Integer, obj).value
+            rangecheck(MIN_INT, val, MAX_INT)
+            return val
+
+
 @dataclass
 class DictStorage(SaveableStorage[dict[str, Object]]):
     """Saveable storage for Dict objects."""
@@ -427,7 +605,7 @@ def typecheck(a_type, *vals) -> None:
                 typename = "name"
             else:
                 typename = a_type.typename
-            raise Tilted("typecheck", f"expected {typename}, got {type(val).typename}")
+            raise Tilted("typecheck", "expected {}, got {}", typename, type(val).typename)
 
 
 def typecheck_procedure(*objs):
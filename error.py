@@ -1,19 +1,43 @@
 """Errors that Stilted can raise."""
 
+from typing import Any
+
 class Tilted(Exception):
-    """A Stilted exception that will be handled by Stilted."""
+    """
+    A Stilted exception that will be handled by Stilted.
+
+    Errors are often caught by `stopped` and never reported, so the `info`
+    message is only formatted from `info_args` when it is read.
+    """
 
-    def __init__(self, errname: str, info: str|None=None) -> None:
+    def __init__(self, errname: str, info: str|None=None, *info_args: Any) -> None:
         super().__init__(errname)
         assert errname in ERROR_NAMES
         self.errname = errname
-        self.info = info
+        self._info = info
+        self._info_args = info_args
+
+    @property
+    def info(self) -> str | None:
+        """Extra information about the error."""
+        if self._info is not None and self._info_args:
+            return self._info.format(*self._info_args)
+        return self._info
 
 
 class StiltedError(Exception):
     """An exception to raise to the Python wrapper."""
 
 
+class StiltedQuit(SystemExit):
+    """
+    Raised by `quit`.
+
+    It's a SystemExit, so the command line ends, but a server running many
+    jobs can catch it to end just the current job.
+    """
+
+
 # These are the official error names, though Stilted can't raise all of them.
 
 ERROR_NAMES = {
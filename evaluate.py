@@ -2,22 +2,35 @@
 
 from __future__ import annotations
 
+import array
+import asyncio
+import concurrent.futures
+import dataclasses
+import hashlib
+import importlib
 import itertools
 import random
 import sys
 from dataclasses import dataclass
-from typing import Any, Iterable, Iterator, cast
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, cast
 
-from error import ERROR_NAMES, Tilted
+from error import ERROR_NAMES, StiltedError, StiltedQuit, Tilted
 from lex import lexer
-from device import Device
 from dtypes import (
     from_py, typecheck,
     Array, ArrayStorage, Boolean, Dict, DictStorage, Integer,
     MARK, Mark, Name, NULL, Null,
-    Object, Operator, Real, Save, SaveableObject, String,
+    Object, Operator, Real, Save, SaveableObject, String, Vector,
+    MAX_INT, MIN_INT,
 )
-from gstate import GstateExtras, SavedGstate
+from extension import Extension, load_extension
+from globalvm import GlobalVM
+from gstate import DeferredGstate, GstateExtras, SavedGstate
+from util import LruCache
+
+if TYPE_CHECKING:   # pragma: no cover
+    # This imports PyCairo, which is slow, so it is imported when needed.
+    from device import Device
 
 
 class Engine:
@@ -26,16 +39,23 @@ class Engine:
     # Operand stack
     ostack: list[Object]
 
+    # The positions of marks on the operand stack, in increasing order. This
+    # has to be kept up to date whenever the operand stack changes: use the
+    # opush/opop/opopn/otrim methods rather than changing the stack directly.
+    marks: list[int]
+
     # Dictionary stack
     dstack: list[Dict]
 
-    # Objects popped by the current operator, so they can be put back for error
-    # handling if needed.
+    # Objects popped by the current operator, in stack order, so they can be
+    # put back for error handling if needed. The list is reused: it's cleared
+    # when an operator starts, rather than allocated for every object.
     popped: list[Object]
 
     # Execution stack. This is a mix of:
-    #   1) Iterators of Stilted Objects (procedures)
-    #   2) Python callables (used for internal work)
+    #   1) ProcFrames (procedures being run)
+    #   2) TextFrames and TokensFrames (text being run)
+    #   3) Python callables (used for internal work)
     estack: list[Any]
 
     # Save-object stack
@@ -44,7 +64,8 @@ class Engine:
     # gsave stack
     # Most of the graphics state is in PyCairo, but we need other information
     # for each gstate.
-    gstack: list[SavedGstate]
+    # Before the device is made, the gstates are DeferredGstates.
+    gstack: list[SavedGstate | DeferredGstate]
 
     # Information for state beyond the Cairo gstate.
     gextra: GstateExtras
@@ -58,12 +79,61 @@ class Engine:
     # Sequence of serial numbers for save objects
     save_serials: Iterator[int]
 
-    # Output device
-    device: Device
+    # The output file name, or None to discard the output, and the page size.
+    outfile: str | None
+    size: tuple[int, int] | None
+
+    # Output device, made when first needed. Use `device` instead.
+    _device: Device | None
+
+    # If not None, finished pages are written by this executor, and the
+    # futures for the pages not known to be written are in `pending_pages`.
+    page_executor: concurrent.futures.Executor | None
+    pending_pages: list[concurrent.futures.Future]
+
+    # Should `bind` also fold constant computations?
+    fold_constants: bool
+
+    # If not None, a file to write a checkpoint to at every `showpage`.
+    checkpoint_file: str | None
+
+    # Tokens from executable strings, keyed by a hash of the string's bytes.
+    text_cache: LruCache[bytes, list[Object]]
+
+    # The default error handlers in errordict, by error name.
+    error_handlers: dict[str, Array]
+
+    # Global VM, shared with other engines given the same GlobalVM.
+    global_vm: GlobalVM
+
+    # Are new composite objects allocated in global VM? See `setglobal`.
+    vm_global: bool
+
+    # Resources defined in local VM, by category name.
+    resources: Dict
 
-    def __init__(self, stdout=None, outfile="page.svg", size=None) -> None:
-        """Construct the initial data needed for execution."""
+    # The extensions loaded with `add_extension`.
+    extensions: list[Extension]
+
+    def __init__(
+        self,
+        stdout=None,
+        outfile="page.svg",
+        size=None,
+        fold_constants: bool=False,
+        checkpoint_file: str | None=None,
+        text_cache_size: int=100,
+        global_vm: GlobalVM | None=None,
+        extensions: Iterable[Extension | str]=(),
+    ) -> None:
+        """
+        Construct the initial data needed for execution.
+
+        Engines given the same `global_vm` share the objects in it.
+        `extensions` are loaded with `add_extension`.
+        """
         self.ostack = []
+        self.marks = []
         self.dstack = []
         self.estack = []
         self.sstack = []
@@ -76,44 +146,104 @@ class Engine:
         self.gextra = GstateExtras()
         self.stdout = stdout or sys.stdout
         self.save_serials = itertools.count()
-        self.device = Device.from_filename(outfile, size)
+        self.outfile = outfile
+        self.size = size
+        self._device = None
+        self.page_executor = None
+        self.pending_pages = []
+        self.fold_constants = fold_constants
+        self.checkpoint_file = checkpoint_file
+        self.text_cache = LruCache(text_cache_size)
+        self.global_vm = global_vm or GlobalVM()
+        self.vm_global = False
+        self.extensions = []
 
         self.new_save()
 
-        systemdict = self.new_dict(value=SYSTEMDICT)
+        # SYSTEMDICT is shared by every engine, so each engine gets a copy.
+        systemdict = self.new_dict(value=dict(SYSTEMDICT))
         systemdict["systemdict"] = systemdict
         self.dstack.append(systemdict)
 
+        # The default error handlers are `{ /errname .error }`.  They are
+        # remembered so that _handle_error can skip running them.
         systemdict["$error"] = self.new_dict()
-        systemdict["errordict"] = self.new_dict()
+        errordict = self.new_dict()
+        systemdict["errordict"] = errordict
+        self.error_handlers = {}
         for err_name in ERROR_NAMES:
-            self.exec_text(
-                f"errordict /{err_name} {{ /{err_name} .error }} put"
+            handler = self.new_array(
+                value=[Name(True, err_name), SYSTEMDICT[".error"]],
+                literal=False,
             )
+            errordict[err_name] = handler
+            self.error_handlers[err_name] = handler
 
         # More systemdict initialization.
-        self.exec_text("""
-            /=string 150 string def     % Not standardized, but expected.
-            /languagelevel 1 def
-            /product (Stilted) def
-            /version (0.0) def
-            """)
+        # =string isn't standardized, but is expected.
+        systemdict["=string"] = String.from_size(150)
+        systemdict["languagelevel"] = Integer(True, 1)
+        systemdict["product"] = String.from_bytes(b"Stilted")
+        systemdict["version"] = String.from_bytes(b"0.0")
+        systemdict["globaldict"] = self.global_vm.globaldict
+        self.resources = self.new_dict()
+
+        for ext in extensions:
+            self.add_extension(ext)
 
         userdict = self.new_dict()
         systemdict["userdict"] = userdict
         self.dstack.append(userdict)
 
-        # More initialization.
-        self.exec_text("""
-            2 dict dup begin
-            /FontName (sans) def
-            /FontMatrix [1 0 0 1 0 0] def
-            end setfont
-            """)
+        # The initial font. It's given to Cairo when the device is made.
+        self.gextra.font_dict = {
+            "FontName": String.from_bytes(b"sans"),
+            "FontMatrix": self.new_object([1, 0, 0, 1, 0, 0]),
+        }
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Get the state for pickling. See checkpoint.py."""
+        state = self.__dict__.copy()
+        del state["stdout"]
+        state["save_serials"] = next(self.save_serials)
+        state["text_cache"] = LruCache(self.text_cache.maxsize)
+        state["page_executor"] = None
+        state["pending_pages"] = []
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """Set the state from unpickling. See checkpoint.py."""
+        self.__dict__.update(state)
+        self.stdout = sys.stdout
+        self.save_serials = itertools.count(state["save_serials"])
 
     def add_text(self, text: str) -> None:
         """Consume text as Stilted tokens, and add for execution."""
-        self.estack.append(self._collect_objects(lexer.tokens(text)))
+        self.estack.append(TextFrame(text, 0))
+
+    def add_string(self, s: String) -> None:
+        """
+        Add the text of an executable String for execution.
+
+        The tokens are cached, so executing the same text again doesn't have
+        to lex it again.
+        """
+        data = s.value
+        key = hashlib.blake2b(data, digest_size=16).digest()
+        tokens = self.text_cache.get(key)
+        if tokens is None:
+            text = data.decode("iso8859-1")
+            if self.text_cache.maxsize <= 0:
+                self.add_text(text)
+                return
+            try:
+                tokens = list(lexer.tokens(text))
+            except Tilted:
+                # Lex it lazily, so the syntax error happens in its place.
+                self.add_text(text)
+                return
+            self.text_cache.put(key, tokens)
+        self.estack.append(TokensFrame(tokens, 0))
 
     def exec_text(self, text: str) -> None:
         """Run Stilted text."""
@@ -124,11 +254,23 @@ class Engine:
         """Create a String from `text`, and push it on the operand stack."""
         self.opush(String.from_bytes(text.encode("iso8859-1")))
 
-    def _collect_objects(self, tokens: Iterable[Any]) -> Iterator[Any]:
-        """Assemble tokens into objects."""
-        pstack: list[Any] = []
-        for obj in tokens:
+    def next_text_object(self, frame: TextFrame | TokensFrame) -> Object | None:
+        """
+        Read the next object from a TextFrame or TokensFrame, or None at the
+        end of the text.
+
+        Procedures are assembled into executable arrays, so the next object
+        could be many tokens long.
+        """
+        pstack: list[list[Object]] = []
+        while True:
+            obj = frame.next_token()
             match obj:
+                case None:
+                    if pstack:
+                        raise Tilted("syntaxerror")
+                    return None
+
                 case Name(False, "{"):
                     pstack.append([])
 
@@ -139,39 +281,98 @@ class Engine:
                     if pstack:
                         pstack[-1].append(proc)
                     else:
-                        yield proc
+                        return proc
 
                 case _:
                     if pstack:
                         pstack[-1].append(obj)
                     else:
-                        yield obj
+                        return obj
 
-        if pstack:
-            raise Tilted("syntaxerror")
+    def run(self, depth: int=0) -> None:
+        """
+        Run the engine until it stops.
 
-    def run(self) -> None:
-        """Run the engine until it stops."""
-        while self.estack:
-            if callable(self.estack[-1]):
-                func = self.estack.pop()
-                func(self)
-            else:
+        With `depth`, stop when the execution stack is that deep: what was
+        there before is left for whoever was running it.
+        """
+        while self.run_slice(100_000, depth):
+            pass
+
+    async def run_async(
+        self,
+        budget: int=1000,
+        page_executor: concurrent.futures.Executor | None=None,
+    ) -> None:
+        """
+        Run the engine until it stops, letting other asyncio tasks run.
+
+        The engine runs `budget` steps at a time, then yields to the event
+        loop, so many engines can share a thread fairly.  A smaller budget
+        is fairer and more responsive but has more overhead.  Add work first,
+        with `add_text` or `add_string`.
+
+        If `page_executor` is given, finished pages are written with it,
+        and all of them have been written when this returns, even if it
+        raises an exception.
+        """
+        if page_executor is not None:
+            self.page_executor = page_executor
+        try:
+            while self.run_slice(budget):
+                await asyncio.sleep(0)
+        finally:
+            if page_executor is not None:
+                self.page_executor = None
+            pending, self.pending_pages = self.pending_pages, []
+            written = await asyncio.gather(
+                *(asyncio.wrap_future(future) for future in pending),
+                return_exceptions=True,
+            )
+        for result in written:
+            if isinstance(result, BaseException):
+                raise result
+
+    def run_slice(self, budget: int, depth: int=0) -> bool:
+        """
+        Run at most `budget` steps of the engine.
+
+        A step is one object from a procedure or text, or one internal
+        callable.  Returns True if there is more to run above `depth`.
+        """
+        obj: Object = NULL
+        for _ in range(budget):
+            if len(self.estack) <= depth:
+                return False
+            frame = self.estack[-1]
+            if isinstance(frame, ProcFrame):
+                obj = frame.values[frame.pos]
+                frame.pos += 1
+                if frame.pos == frame.end:
+                    # The last object in the procedure: pop the frame before
+                    # executing it, so that tail calls don't grow the estack.
+                    self.estack.pop()
+                self.exec(obj, direct=True)
+            elif isinstance(frame, (TextFrame, TokensFrame)):
                 try:
-                    obj = next(self.estack[-1])
-                except StopIteration:
+                    next_obj = self.next_text_object(frame)
+                except Tilted as tilt:
+                    # An error! The rest of the text is abandoned.
                     self.estack.pop()
+                    self._handle_error(obj, tilt, restore=False)
                     continue
-                except Tilted as tilt:
-                    # An error!
-                    self._handle_error(obj, tilt)
+                if next_obj is None:
+                    self.estack.pop()
                 else:
+                    obj = next_obj
                     self.exec(obj, direct=True)
+            else:
+                func = self.estack.pop()
+                func(self)
+        return len(self.estack) > depth
 
     def exec(self, obj: Object, direct: bool=False) -> None:
         """Execute one Stilted Object."""
-        self.popped = []
-
         try:
             match obj:
                 # PSRM §3.5.5
@@ -183,8 +384,14 @@ class Engine:
                 case Array():
                     if direct:
                         self.opush(obj)
-                    else:
-                        self.estack.append(iter(obj.value))
+                    elif obj.length:
+                        if isinstance(obj.value, list):
+                            frame = ProcFrame(obj.value, obj.start, obj.start + obj.length)
+                        else:
+                            # Numbers stored compactly have to be made into
+                            # objects to run them.
+                            frame = ProcFrame(obj.contents(), 0, obj.length)
+                        self.estack.append(frame)
 
                 case Integer() | Real() | Boolean() | Mark():
                     self.opush(obj)
@@ -199,27 +406,41 @@ class Engine:
                     pass
 
                 case Operator():
+                    self.popped.clear()
                     obj.value(self)
 
                 case String():
-                    self.add_text(obj.str_value)
+                    self.add_string(obj)
 
                 case _:
                     raise Exception(f"Buh? {obj!r}")
 
         except Tilted as tilt:
             # An error!
-            self._handle_error(obj, tilt)
+            self._handle_error(obj, tilt, restore=isinstance(obj, Operator))
 
-    def _handle_error(self, obj: Object, tilt: Tilted) -> None:
+    def _handle_error(self, obj: Object, tilt: Tilted, restore: bool) -> None:
         """Handle an error: §3.11.1"""
-        # Put back what was popped, push the object,
+        # Put back what was popped (if `restore`), push the object,
         # find the error name in `errordict`, and execute it.
-        self.opush(*self.popped[::-1])
-        self.opush(obj)
+        if restore:
+            self.opush(*self.popped)
         errordict = self.builtin_dict("errordict")
         handler = errordict[tilt.errname]
-        self.exec(handler)
+        if handler is self.error_handlers[tilt.errname]:
+            # The default handler: do what it does without running it.
+            self.signal_error(Name(True, tilt.errname), obj)
+        else:
+            self.opush(obj)
+            self.exec(handler)
+
+    def signal_error(self, errorname: Name, command: Object) -> None:
+        """Record an error in $error, and stop. This is what `.error` does."""
+        serror = self.builtin_dict("$error")
+        serror["newerror"] = from_py(True)
+        serror["errorname"] = errorname
+        serror["command"] = command
+        self.exec(SYSTEMDICT["stop"])
 
     def exec_name(self, name: str) -> None:
         """Run a name."""
@@ -237,7 +458,9 @@ class Engine:
         """
         self.ohas(1)
         obj = self.ostack.pop()
-        self.popped.append(obj)
+        if obj is MARK:
+            self.marks.pop()
+        self.popped.insert(0, obj)
         if a_type is not None:
             typecheck(a_type, obj)
         return obj
@@ -250,19 +473,38 @@ class Engine:
         """
         self.ohas(n)
         if n == 0:
-            vals = []
             return []
 
         vals = self.ostack[-n:]
         if a_type is not None:
             typecheck(a_type, *vals)
-        del self.ostack[-n:]
-        self.popped.extend(vals[::-1])
+        self.otrim(len(self.ostack) - n)
+        self.popped[:0] = vals
         return vals
 
     def opush(self, *vals: Object) -> None:
         """Push values on the operand stack."""
-        self.ostack.extend(vals)
+        ostack = self.ostack
+        for val in vals:
+            if val is MARK:
+                self.marks.append(len(ostack))
+            ostack.append(val)
+
+    def refind_marks(self, base: int) -> None:
+        """Find the marks above `base`, after that part of the stack moved."""
+        marks = self.marks
+        if marks and marks[-1] >= base:
+            while marks and marks[-1] >= base:
+                marks.pop()
+            ostack = self.ostack
+            marks.extend(i for i in range(base, len(ostack)) if ostack[i] is MARK)
+
+    def otrim(self, height: int) -> None:
+        """Remove all the operands above `height`."""
+        del self.ostack[height:]
+        marks = self.marks
+        while marks and marks[-1] >= height:
+            marks.pop()
 
     def ohas(self, n: int) -> None:
         """Operand stack must have n entries, or stackunderflow."""
@@ -276,10 +518,9 @@ class Engine:
 
     def counttomark(self) -> int:
         """How deep is the nearest mark on the operand stack?"""
-        for i, val in enumerate(reversed(self.ostack)):
-            if val is MARK:
-                return i
-        raise Tilted("unmatchedmark")
+        if not self.marks:
+            raise Tilted("unmatchedmark")
+        return len(self.ostack) - 1 - self.marks[-1]
 
     def pstack(self, stack: list[Object]) -> None:
         """Print a stack to stdout."""
@@ -295,30 +536,242 @@ class Engine:
     def new_array(
         self,
         n: int=None,
-        value: list[Object]=None,
+        value: list[Object] | array.array=None,
         literal:bool=True,
     ) -> Array:
-        """Make a new Array, either by size or contents."""
+        """
+        Make a new Array, either by size or contents.
+
+        Literal arrays of numbers are stored compactly.  `value` can be an
+        array.array of numbers to use as the compact storage.
+        """
+        data: list[Object] | array.array
         if value is None:
             assert n is not None
-            value = [NULL] * n
+            data = [NULL] * n
         else:
             n = len(value)
+            if isinstance(value, array.array):
+                data = value
+            else:
+                if self.vm_global:
+                    self.check_global_store(value)
+                data = ArrayStorage.pack(value) if literal else value
         return Array(
             literal=literal,
-            storage=ArrayStorage(values=[(self.sstack[-1], value)]),
+            storage=ArrayStorage(values=[(self.alloc_save(), data)]),
             start=0,
             length=n,
         )
 
+    def new_vector(self, value: array.array) -> Vector:
+        """Make a new Vector holding the numbers in `value`."""
+        return Vector(
+            literal=True,
+            storage=ArrayStorage(values=[(self.alloc_save(), value)]),
+            start=0,
+            length=len(value),
+        )
+
     def new_dict(self, value: dict[str, Object]=None) -> Dict:
         """Make a new Dict."""
-        value = value if value is not None else {}
+        if value is None:
+            value = {}
+        elif self.vm_global:
+            self.check_global_store(value.values())
         return Dict(
             literal=True,
-            storage=DictStorage(values=[(self.sstack[-1], value)]),
+            storage=DictStorage(values=[(self.alloc_save(), value)]),
         )
 
+    ##
+    ## Python data.
+    ##
+
+    def new_object(self, val: Any) -> Object:
+        """
+        Make a Stilted object from Python data.
+
+        Lists and tuples become arrays, and dicts with string keys become
+        dictionaries.  bytes and other byte buffers become strings; a
+        bytearray is shared rather than copied.  An array.array, or anything
+        else with a buffer of numbers (like a NumPy array), becomes a vector.
+        Stilted objects are used as they are.
+        """
+        match val:
+            case Object():
+                return val
+            case bool() | int() | float() | str() | None:
+                return from_py(val)
+            case list() | tuple():
+                return self.new_array(value=[self.new_object(v) for v in val])
+            case dict():
+                value = {}
+                for k, v in val.items():
+                    if not isinstance(k, str):
+                        raise TypeError(f"Dict keys must be strings, not {k!r}")
+                    value[k] = self.new_object(v)
+                return self.new_dict(value=value)
+            case bytearray():
+                return String(literal=True, data=val, start=0, length=len(val))
+            case bytes():
+                return String.from_bytes(val)
+            case array.array(typecode="d"):
+                return self.new_vector(val)
+            case array.array(typecode="q") if not val or (
+                MIN_INT <= min(val) and max(val) <= MAX_INT
+            ):
+                return self.new_vector(val)
+        try:
+            buffer = memoryview(val)
+        except TypeError:
+            raise TypeError(f"Can't make a Stilted object from {val!r}") from None
+        return self.new_object_from_buffer(buffer)
+
+    def new_object_from_buffer(self, buffer: memoryview) -> Object:
+        """Make a String or Vector from a buffer."""
+        if buffer.ndim != 1:
+            return self.new_object(buffer.tolist())
+        if buffer.format in ("B", "b", "c"):
+            return String.from_bytes(buffer.tobytes())
+        if buffer.format in ("d", "f"):
+            return self.new_vector(array.array("d", buffer.tolist()))
+        if buffer.format in ("h", "H", "i", "I", "l", "L", "q", "Q", "n", "N"):
+            nums = buffer.tolist()
+            if not nums or (MIN_INT <= min(nums) and max(nums) <= MAX_INT):
+                return self.new_vector(array.array("q", nums))
+            return self.new_vector(array.array("d", nums))
+        raise TypeError(f"Can't make a Stilted object from a buffer of {buffer.format!r}")
+
+    def to_py(self, obj: Object, memo: dict[Any, Any] | None=None) -> Any:
+        """
+        Make Python data from a Stilted object.
+
+        The reverse of `new_object`: arrays become lists, vectors become
+        array.arrays, dictionaries become dicts, strings become bytes, and
+        names become str.  Objects with no Python equivalent, like operators
+        and marks, are returned as they are.
+        """
+        match obj:
+            case Integer() | Real() | Boolean():
+                return obj.value
+            case Null():
+                return None
+            case String():
+                return bytes(obj.contents())
+            case Name():
+                return obj.value
+            case Vector():
+                return obj.numbers()
+            case Array() | Dict():
+                # Arrays and dicts can contain themselves. `memo` maps the
+                # objects being converted to their Python values.
+                if memo is None:
+                    memo = {}
+                if isinstance(obj, Array):
+                    key: Any = (id(obj.storage), obj.start, obj.length)
+                else:
+                    key = id(obj.storage)
+                if key in memo:
+                    return memo[key]
+                if isinstance(obj, Array):
+                    result: Any = []
+                    memo[key] = result
+                    result.extend(self.to_py(o, memo) for o in obj)
+                else:
+                    result = {}
+                    memo[key] = result
+                    for k, v in obj.value.items():
+                        result[k] = self.to_py(v, memo)
+                return result
+        return obj
+
+    def push_py(self, *vals: Any) -> None:
+        """Push Python values on the operand stack as Stilted objects."""
+        self.opush(*map(self.new_object, vals))
+
+    def pop_py(self) -> Any:
+        """Remove the top operand, returning it as Python data."""
+        return self.to_py(self.opop())
+
+    def add_extension(self, ext: Extension | str, name: str | None=None) -> Dict:
+        """
+        Define a dict of an extension's operators in systemdict.
+
+        `ext` is an Extension, or a "module:name" string to import one from.
+        The dict is named `name`, or the extension's own name.
+        """
+        if isinstance(ext, str):
+            ext = load_extension(ext)
+        name = name or ext.name
+        systemdict = self.dstack[0]
+        if name in systemdict:
+            raise ValueError(f"Can't define extension {ext.name!r} as {name!r}: already defined")
+        ext_dict = self.new_dict(value=dict(ext.operators))
+        self.prep_for_change(systemdict, (ext_dict,))
+        systemdict[name] = ext_dict
+        self.extensions.append(ext)
+        return ext_dict
+
+    def call(self, name: str, *args: Any) -> list[Any]:
+        """
+        Run the operator or procedure named `name` with `args`.
+
+        See `call_proc` for how arguments, results, and errors are handled.
+        """
+        return self.call_proc(Name(False, name), *args)
+
+    def call_proc(self, proc: Object, *args: Any) -> list[Any]:
+        """
+        Run `proc` with `args` on the operand stack, and return its results.
+
+        `args` are made into Stilted objects with `new_object`.  `proc` is
+        executed as `exec` would, so it should be an executable array, name,
+        or operator.  Whatever it leaves on the operand stack is removed and
+        returned as a list of Python data.
+
+        A Stilted error becomes a StiltedError, with the operand stack as it
+        was before the call.  No text is lexed, so this is much cheaper than
+        building a string for `exec_text`.
+
+        Operators can use this too: only `proc` is run, and the rest of the
+        running program continues when the operator returns.
+        """
+        base = len(self.ostack)
+        depth = len(self.estack)
+        # The operators run by `proc` reuse self.popped, but an operator
+        # calling us needs its own operands back if it fails afterward.
+        popped = self.popped[:]
+        try:
+            self.push_py(*args)
+            self.opush(proc)
+            self.exec(SYSTEMDICT["stopped"])
+            # Operators can call this while the engine is running, so run just
+            # the `stopped`, and leave the rest of the estack alone.
+            self.run(depth)
+        finally:
+            self.popped[:] = popped
+        if cast(Boolean, self.ostack.pop()).value:
+            errorname = self.take_error()
+            self.otrim(base)
+            raise StiltedError(errorname)
+        results = [self.to_py(obj) for obj in self.ostack[base:]]
+        self.otrim(base)
+        return results
+
+    def take_error(self) -> str:
+        """
+        After `stopped` returned true, get the error name and clear the error.
+
+        If there was no error, just `stop`, the name is "stop".
+        """
+        serror = self.builtin_dict("$error")
+        if "newerror" in serror and cast(Boolean, serror["newerror"]).value:
+            serror["newerror"] = from_py(False)
+            return cast(Name, serror["errorname"]).str_value
+        else:
+            return "stop"
+
     ##
     ## Dict stack methods.
     ##
@@ -356,20 +809,132 @@ class Engine:
         self.sstack.append(save)
         return save
 
-    def prep_for_change(self, obj: SaveableObject) -> None:
-        """An object is about to change. Do save/restore bookkeeping."""
-        obj.prep_for_change(self.sstack[-1])
+    def prep_for_change(
+        self,
+        obj: SaveableObject,
+        new_values: Iterable[Object]=(),
+    ) -> None:
+        """
+        An object is about to change. Do save/restore bookkeeping.
+
+        `new_values` are the objects about to be stored in `obj`.  Objects in
+        global VM can't refer to local ones, and aren't saved and restored.
+        """
+        if obj.storage.values[0][0] is self.global_vm.save:
+            self.check_global_store(new_values)
+        else:
+            obj.prep_for_change(self.sstack[-1])
+
+    ##
+    ## Global VM methods.
+    ##
+
+    def alloc_save(self) -> Save:
+        """The Save object to tag a new composite object with."""
+        return self.global_vm.save if self.vm_global else self.sstack[-1]
+
+    def gcheck(self, obj: Object) -> bool:
+        """
+        Can `obj` be stored in global VM?
+
+        Simple objects can.  Strings aren't saved and restored in Stilted, so
+        they can too.  Arrays and dicts can only if they are in global VM.
+        """
+        if isinstance(obj, SaveableObject):
+            return obj.storage.values[0][0] is self.global_vm.save
+        return True
+
+    def check_global_store(self, values: Iterable[Object]) -> None:
+        """Raise invalidaccess if any of `values` is local."""
+        for val in values:
+            if not self.gcheck(val):
+                raise Tilted("invalidaccess", "local {} in global VM", val.typename)
 
     ##
     ## Graphics stack methods.
     ##
 
+    @property
+    def device(self) -> Device:
+        """
+        The output device.
+
+        Making the device makes a Cairo context, so it isn't done until a
+        graphics operator needs it.  Jobs that never draw never make one.
+        """
+        if self._device is None:
+            self.make_device()
+            assert self._device is not None
+        return self._device
+
+    def make_device(self) -> None:
+        """Make the output device, and give it the current graphics state."""
+        from device import Device
+        self._device = Device.from_filename(self.outfile, self.size)
+        self.set_font(self.gextra.font_dict)
+        # The gstates saved so far have the initial Cairo state, which can
+        # only be captured now.
+        initial = SavedGstate.from_ctx(
+            from_save=False,
+            ctx=self._device.ctx,
+            extra=self.gextra,
+        )
+        self.gstack = [
+            dataclasses.replace(initial, from_save=gsx.from_save, gextra=gsx.gextra)
+            for gsx in self.gstack
+        ]
+
+    def write_page(self, writer: Callable[[], None]) -> None:
+        """Write a finished page, with `page_executor` if there is one."""
+        if self.page_executor is None:
+            writer()
+        else:
+            self.pending_pages.append(self.page_executor.submit(writer))
+
+    def wait_for_pages(self) -> None:
+        """Wait until the pages given to `page_executor` are written."""
+        pending, self.pending_pages = self.pending_pages, []
+        for future in pending:
+            future.result()
+
+    def set_outfile(self, outfile: str | None) -> None:
+        """
+        Write pages to `outfile` from now on, discarding the current page.
+
+        The graphics state is kept.  So is the device, if it can write to
+        `outfile`.  A new device can have a different default matrix, so the
+        saved matrices are adjusted to it.
+        """
+        self.outfile = outfile
+        if self._device is not None:
+            from device import Device, device_change, device_class
+            current = SavedGstate.from_ctx(
+                from_save=False,
+                ctx=self._device.ctx,
+                extra=self.gextra,
+            )
+            if type(self._device) is device_class(outfile):
+                self._device.start_output(outfile)
+            else:
+                old_device = self._device
+                self._device = Device.from_filename(outfile, self.size)
+                change = device_change(old_device, self._device)
+                current = current.for_new_device(change)
+                self.gstack = [
+                    gsx.for_new_device(change) if isinstance(gsx, SavedGstate) else gsx
+                    for gsx in self.gstack
+                ]
+            current.restore_to_ctx(self._device.ctx, self)
+
     @property
     def gctx(self):
         return self.device.ctx
 
     def gsave(self, from_save: bool) -> None:
         """Add a new gstate to the gstack."""
+        if self._device is None:
+            self.gstack.append(DeferredGstate(from_save, self.gextra.copy()))
+            return
         self.gstack.append(
             SavedGstate.from_ctx(
                 from_save=from_save,
@@ -378,29 +943,89 @@ class Engine:
             )
         )
 
+    def restore_gstate(self, gsx: SavedGstate | DeferredGstate) -> None:
+        """Restore a gstate from the gstack."""
+        if isinstance(gsx, DeferredGstate):
+            # There's no device yet, so only the extras can have changed.
+            self.gextra = gsx.gextra
+        else:
+            gsx.restore_to_ctx(self.gctx, self)
+
     def grestore(self) -> None:
         if self.gstack:
             gsx = self.gstack[-1]
             if not gsx.from_save:
                 self.gstack.pop()
-            gsx.restore_to_ctx(self.gctx, self)
+            self.restore_gstate(gsx)
 
     def grestoreall(self) -> None:
         """Roll back the gstack to the last save."""
         if self.gstack:
             while not self.gstack[-1].from_save:
                 self.gstack.pop()
-            self.gstack[-1].restore_to_ctx(self.gctx, self)
+            self.restore_gstate(self.gstack[-1])
 
     def set_font(self, font_dict: dict[str, Object]) -> None:
         import cairo_util
         self.gextra.font_dict = font_dict
         self.gctx.select_font_face(cast(Name, font_dict["FontName"]).str_value)
-        fmtx = cairo_util.array_to_cmatrix(font_dict["FontMatrix"])
+        fmtx = cairo_util.array_to_new_cmatrix(font_dict["FontMatrix"])
         fmtx.scale(1, -1)   # All our devices are flipped.
         self.gctx.set_font_matrix(fmtx)
 
 
+@dataclass(slots=True)
+class ProcFrame:
+    """
+    An item on the execstack for a procedure being run.
+
+    `values` is the list of objects in the procedure's storage, `pos` is the
+    index of the next object to execute, and `end` is the index past the last
+    object.
+    """
+    values: list[Object]
+    pos: int
+    end: int
+
+
+@dataclass(slots=True)
+class TextFrame:
+    """
+    An item on the execstack for text being run.
+
+    `pos` is the index in `text` of the next character to read.
+    """
+    text: str
+    pos: int
+
+    def next_token(self) -> Object | None:
+        """Lex the next token, or return None at the end of the text."""
+        obj, self.pos = lexer.next_token(self.text, self.pos)
+        return obj
+
+
+@dataclass(slots=True)
+class TokensFrame:
+    """
+    An item on the execstack for text that has already been lexed.
+
+    `tokens` is shared with the text cache, so each token is copied as it is
+    read: the program could change the copy (`cvx`, `put`, and so on).
+    """
+    tokens: list[Object]
+    pos: int
+
+    def next_token(self) -> Object | None:
+        """Get a copy of the next token, or return None at the end."""
+        if self.pos == len(self.tokens):
+            return None
+        token = self.tokens[self.pos]
+        self.pos += 1
+        if isinstance(token, String):
+            return String.from_bytes(token.value)
+        return type(token)(token.literal, token.value)     # type: ignore
+
+
 @dataclass
 class Exitable:
     """An item on the execstack that can be `exit`ed."""
@@ -415,6 +1040,35 @@ def evaluate(text: str, stdout=None) -> Engine:
     return engine
 
 
+def run_round_robin(
+    engines: Iterable[Engine],
+    budget: int=1000,
+) -> list[BaseException | None]:
+    """
+    Run engines in one thread, taking turns until they all stop.
+
+    Each engine runs `budget` steps per turn.  Add work to the engines first,
+    with `add_text` or `add_string`.
+
+    An engine that raises an exception (including `quit`) is dropped, and the
+    others carry on.  Returns a list with the exception that stopped each
+    engine, or None for the ones that finished.
+    """
+    engines = list(engines)
+    stopped_by: list[BaseException | None] = [None] * len(engines)
+    running = list(enumerate(engines))
+    while running:
+        still_running = []
+        for i, engine in running:
+            try:
+                if engine.run_slice(budget):
+                    still_running.append((i, engine))
+            except (Exception, StiltedQuit) as exc:
+                stopped_by[i] = exc
+        running = still_running
+    return stopped_by
+
+
 def operator(arg):
     """
     Define a built-in operator.
@@ -436,13 +1090,40 @@ def operator(arg):
     if isinstance(arg, str):
         def _dec(func):
             assert func.__name__.endswith("_")
-            assert arg not in SYSTEMDICT
-            SYSTEMDICT[arg] = Operator(literal=False, value=func, name=arg)
+            define_operator(arg, func)
         return _dec
     else:
-        name = arg.__name__
+        define_operator(arg.__name__, arg)
+
+
+def define_operator(name: str, func: Callable[[Engine], None]) -> None:
+    """Put an operator in SYSTEMDICT, or fill in its lazy placeholder."""
+    op = SYSTEMDICT.get(name)
+    if isinstance(op, Operator) and isinstance(op.value, LazyOperator):
+        assert op.value.modname == func.__module__
+        op.value = func
+    else:
         assert name not in SYSTEMDICT
-        SYSTEMDICT[name] = Operator(literal=False, value=arg, name=name)
+        assert func.__module__ not in LAZY_OPERATORS, f"{name} isn't in LAZY_OPERATORS"
+        SYSTEMDICT[name] = Operator(literal=False, value=func, name=name)
+
+
+@dataclass
+class LazyOperator:
+    """
+    The value of an operator whose module hasn't been imported yet.
+
+    Importing the module replaces the Operator's value with the real function,
+    so this is only called once for each operator.
+    """
+    modname: str
+    name: str
+
+    def __call__(self, engine: Engine) -> None:
+        importlib.import_module(self.modname)
+        op = cast(Operator, SYSTEMDICT[self.name])
+        assert not isinstance(op.value, LazyOperator)
+        op.value(engine)
 
 
 # The `systemdict` dict for all builtin names.
@@ -453,6 +1134,43 @@ SYSTEMDICT["null"] = from_py(None)
 SYSTEMDICT["true"] = from_py(True)
 
 
+# The graphics operators need PyCairo, which is slow to import, and many jobs
+# never draw anything.  Their modules are imported the first time one of
+# their operators is run.  Until then, the operators are placeholders.
+LAZY_OPERATORS = {
+    "op_font": """
+        charpath currentfont findfont scalefont setfont show stringwidth
+        """,
+    "op_gstate": """
+        currentcmykcolor currentdash currentflat currentgray currenthsbcolor
+        currentlinecap currentlinejoin currentlinewidth currentmiterlimit
+        currentrgbcolor grestore grestoreall gsave setcmykcolor setdash
+        setflat setgray sethsbcolor setlinecap setlinejoin setlinewidth
+        setmiterlimit setrgbcolor showpage
+        """,
+    "op_matrix": """
+        .dtransformpoints .idtransformpoints .itransformpoints
+        .transformpoints concat concatmatrix currentmatrix defaultmatrix
+        dtransform identmatrix idtransform initmatrix invertmatrix itransform
+        matrix rotate scale setmatrix transform translate
+        """,
+    "op_paint": """
+        eofill fill stroke
+        """,
+    "op_path": """
+        arc arcn clip clippath closepath currentpoint curveto eoclip
+        flattenpath initclip lineto moveto newpath pathforall rcurveto
+        rlineto rmoveto
+        """,
+}
+
+for modname, names in LAZY_OPERATORS.items():
+    for name in names.split():
+        SYSTEMDICT[name] = Operator(
+            literal=False, value=LazyOperator(modname, name), name=name,
+        )
+
+
 # Imported but not used, assert them to quiet the linter.
 # Import at the bottom of the file to avoid circular import problems.
 import op_array; assert op_array
@@ -460,16 +1178,13 @@ import op_collections; assert op_collections
 import op_control; assert op_control
 import op_dict; assert op_dict
 import op_error; assert op_error
-import op_font; assert op_font
-import op_gstate; assert op_gstate
 import op_math; assert op_math
-import op_matrix; assert op_matrix
 import op_misc; assert op_misc
 import op_output; assert op_output
-import op_paint; assert op_paint
-import op_path; assert op_path
 import op_relational; assert op_relational
+import op_resource; assert op_resource
 import op_stack; assert op_stack
 import op_string; assert op_string
 import op_type; assert op_type
+import op_vector; assert op_vector
 import op_vm; assert op_vm
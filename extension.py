@@ -0,0 +1,162 @@
+"""
+Extensions: operators defined in Python outside of Stilted.
+
+An extension is a set of operators.  Each engine that loads it gets a dict of
+the operators, defined in systemdict under the extension's name, or another
+name if the engine chooses one.  Programs use the operators from the dict:
+
+    strutil begin ... end
+
+An extension module makes an Extension, and defines operators with its
+decorators:
+
+    extension = Extension("strutil")
+
+    @extension.operator
+    def upcase(engine: Engine) -> None:
+        ...
+
+    @extension.py_operator
+    def join(sep: bytes, items: list) -> bytes:
+        return sep.join(items)
+
+Engines load extensions given to them as Extension objects or "module:name"
+strings.  Installed packages can also advertise their extensions with entry
+points in the "stilted.extensions" group, found by `find_extensions`.
+
+"""
+
+from __future__ import annotations
+
+import importlib
+import importlib.metadata
+import inspect
+from typing import TYPE_CHECKING, Any, Callable
+
+from error import Tilted
+from dtypes import Operator
+
+if TYPE_CHECKING:   # pragma: no cover
+    from evaluate import Engine
+
+
+ENTRY_POINT_GROUP = "stilted.extensions"
+
+POSITIONAL = {
+    inspect.Parameter.POSITIONAL_ONLY,
+    inspect.Parameter.POSITIONAL_OR_KEYWORD,
+}
+
+
+class Extension:
+    """A set of operators defined in Python, to be loaded into engines."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.operators: dict[str, Operator] = {}
+
+    def __repr__(self) -> str:
+        return f"<Extension {self.name!r}>"
+
+    def operator(self, arg):
+        """
+        Define an operator, like the `operator` decorator for built-ins.
+
+        The function is called with the engine, and works with the stacks
+        directly.
+        """
+        if isinstance(arg, str):
+            def _dec(func):
+                assert func.__name__.endswith("_")
+                self.add_operator(arg, func)
+            return _dec
+        else:
+            self.add_operator(arg.__name__, arg)
+
+    def py_operator(self, arg):
+        """
+        Define an operator from a Python function of Python data.
+
+        There is one operand for each parameter of the function.  They are
+        made into Python data with `Engine.to_py`, so arrays become lists.
+        The function's result is pushed with `Engine.new_object`, unless it
+        is None.  This suits operators that take and return whole arrays.
+
+        The parameters must be plain positional ones, without defaults, so the
+        number of operands is fixed.
+
+        Python exceptions from the function become Stilted errors: TypeError
+        is typecheck, ValueError, IndexError and KeyError are rangecheck, and
+        ZeroDivisionError is undefinedresult.  A result that can't be made
+        into a Stilted object is a bug in the extension, and isn't converted.
+        """
+        if isinstance(arg, str):
+            def _dec(func):
+                assert func.__name__.endswith("_")
+                self.add_operator(arg, py_operator_function(func))
+            return _dec
+        else:
+            self.add_operator(arg.__name__, py_operator_function(arg))
+
+    def add_operator(self, name: str, func: Callable[[Engine], None]) -> None:
+        """Add an operator to the extension."""
+        assert name not in self.operators
+        self.operators[name] = Operator(literal=False, value=func, name=name)
+
+
+def py_operator_function(func: Callable[..., Any]) -> Callable[[Engine], None]:
+    """Make an operator function from a function of Python data."""
+    params = inspect.signature(func).parameters.values()
+    for param in params:
+        if param.kind not in POSITIONAL or param.default is not param.empty:
+            raise TypeError(
+                f"{func.__name__}() can only have positional parameters without defaults: {param}"
+            )
+    nargs = len(params)
+
+    def _op(engine: Engine) -> None:
+        args = [engine.to_py(obj) for obj in engine.opopn(nargs)]
+        try:
+            result = func(*args)
+        except TypeError as exc:
+            raise Tilted("typecheck", str(exc)) from exc
+        except (ValueError, IndexError, KeyError) as exc:
+            raise Tilted("rangecheck", str(exc)) from exc
+        except ZeroDivisionError as exc:
+            raise Tilted("undefinedresult", str(exc)) from exc
+        if result is not None:
+            engine.opush(engine.new_object(result))
+
+    return _op
+
+
+def load_extension(spec: str) -> Extension:
+    """
+    Import an Extension from a "module:name" specification.
+
+    With just "module", the Extension is the module's `extension`.
+    """
+    modname, _, attr = spec.partition(":")
+    ext = getattr(importlib.import_module(modname), attr or "extension")
+    if not isinstance(ext, Extension):
+        raise TypeError(f"{spec!r} isn't an Extension: {ext!r}")
+    return ext
+
+
+def extension_specs() -> list[str]:
+    """The "module:name" specifications of installed packages' extensions."""
+    return [
+        entry_point.value
+        for entry_point in importlib.metadata.entry_points(group=ENTRY_POINT_GROUP)
+    ]
+
+
+def find_extensions() -> list[Extension]:
+    """Load the extensions advertised by installed packages' entry points."""
+    exts = []
+    for entry_point in importlib.metadata.entry_points(group=ENTRY_POINT_GROUP):
+        ext = entry_point.load()
+        if not isinstance(ext, Extension):
+            raise TypeError(f"Entry point {entry_point.name!r} isn't an Extension: {ext!r}")
+        exts.append(ext)
+    return exts
@@ -0,0 +1,37 @@
+"""Global VM for Stilted."""
+
+from dataclasses import dataclass, field
+
+from dtypes import Dict, DictStorage, Save
+
+
+def never_restored() -> Save:
+    """Make the Save object that tags objects in global VM."""
+    return Save(literal=True, serial=-1, is_valid=True, changed_objs=[])
+
+
+@dataclass
+class GlobalVM:
+    """
+    Composite objects allocated in global VM, after `true setglobal`.
+
+    Objects in global VM aren't affected by save and restore, so a GlobalVM
+    can be shared by many engines: a prologue loaded into it once can be used
+    by every job.  Pass the same GlobalVM to each Engine to share it.
+    """
+    # Global objects are tagged with this Save object instead of the engine's
+    # current one. It is never restored, and its serial number is older than
+    # any engine's, so restore never finds global objects too new.
+    save: Save = field(default_factory=never_restored)
+
+    # globaldict, and the resources defined in global VM, by category name.
+    globaldict: Dict = field(init=False)
+    resources: Dict = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.globaldict = self.new_dict()
+        self.resources = self.new_dict()
+
+    def new_dict(self) -> Dict:
+        """Make a new empty Dict in global VM."""
+        return Dict(literal=True, storage=DictStorage(values=[(self.save, {})]))
@@ -5,11 +5,10 @@ import dataclasses
 from dataclasses import dataclass, field
 from typing import TYPE_CHECKING
 
-import cairo
-
 from dtypes import Object
 
 if TYPE_CHECKING:   # pragma: no cover
+    import cairo
     from evaluate import Engine
 
 @dataclass
@@ -118,3 +117,29 @@ class SavedGstate:
 
         engine.gextra = self.gextra
         engine.set_font(self.gextra.font_dict)
+
+    def for_new_device(self, change: cairo.Matrix) -> SavedGstate:
+        """
+        Make this gstate suitable for another device.
+
+        `change` maps the old device space to the new one.  The matrices are
+        adjusted so that user space is the same size on the new device.
+        """
+        gextra = self.gextra.copy()
+        gextra.clip_stack = [
+            (fill_rule, mtx.multiply(change), path)
+            for fill_rule, mtx, path in gextra.clip_stack
+        ]
+        return dataclasses.replace(self, ctm=self.ctm.multiply(change), gextra=gextra)
+
+
+@dataclass
+class DeferredGstate:
+    """
+    A gstate saved before the engine made its device.
+
+    Nothing could have been drawn yet, so the Cairo part of the state is the
+    initial one.  When the device is made, these become SavedGstates.
+    """
+    from_save: bool
+    gextra: GstateExtras
@@ -1,6 +1,7 @@
 """Lexical analysis for stilted."""
 
 import base64
+import functools
 import re
 from dataclasses import dataclass
 from typing import Any, Callable, Iterable
@@ -46,15 +47,33 @@ class Lexer:
                 rxes.append(f"({t.rx})")
         self.rx = "(?m)" + "|".join(rxes)
 
+    @functools.cached_property
+    def regex(self) -> re.Pattern:
+        """The compiled regex, compiled when first needed."""
+        return re.compile(self.rx)
+
     def tokens(self, text: str) -> Iterable[Object]:
         """
         Yield Stilted objects for the tokens in `text`.
         """
-        for match in re.finditer(self.rx, text):
+        for match in self.regex.finditer(text):
             if group_name := match.lastgroup:
                 converter = self.converters[group_name]
                 yield converter(match[0])
 
+    def next_token(self, text: str, pos: int) -> tuple[Object | None, int]:
+        """
+        Find the next token in `text`, starting at `pos`.
+
+        Returns the Stilted object for the token, and the position just after
+        it.  At the end of the text, the object is None.
+        """
+        for match in self.regex.finditer(text, pos):
+            if group_name := match.lastgroup:
+                converter = self.converters[group_name]
+                return converter(match[0]), match.end()
+        return None, len(text)
+
 
 def convert_string(text: str) -> String:
     """
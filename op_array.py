@@ -10,17 +10,16 @@ def mark_(engine: Engine) -> None:
 
 @operator("]")
 def array_(engine: Engine) -> None:
-    n = engine.counttomark()
-    objs = engine.opopn(n)
-    engine.opop() # the mark
+    engine.counttomark()
+    mark_pos = engine.marks[-1]
+    objs = engine.ostack[mark_pos + 1:]
+    engine.otrim(mark_pos)
     engine.opush(engine.new_array(value=objs))
 
 @operator
 def aload(engine: Engine) -> None:
     arr = engine.opop(Array)
-    for obj in arr:
-        engine.opush(obj)
-    engine.opush(arr)
+    engine.opush(*arr.contents(), arr)
 
 @operator
 def array(engine: Engine) -> None:
@@ -31,8 +30,7 @@ def array(engine: Engine) -> None:
 @operator
 def astore(engine: Engine) -> None:
     arr = engine.opop(Array)
-    larr = len(arr)
-    engine.ohas(larr)
-    for i in range(larr):
-        arr[larr - i - 1] = engine.opop()
+    objs = engine.opopn(len(arr))
+    engine.prep_for_change(arr, objs)
+    arr.put_contents(0, objs)
     engine.opush(arr)
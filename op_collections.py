@@ -23,7 +23,7 @@ def get(engine: Engine) -> None:
             try:
                 obj = obj[ind.str_value]
             except KeyError:
-                raise Tilted("undefined", f"{ind.value}")
+                raise Tilted("undefined", "{}", ind.value)
             engine.opush(obj)
 
         case String():
@@ -33,7 +33,7 @@ def get(engine: Engine) -> None:
             engine.opush(from_py(byte))
 
         case _:
-            raise Tilted("typecheck", f"got {type(obj)}")
+            raise Tilted("typecheck", "got {}", type(obj))
 
 @operator
 def getinterval(engine: Engine) -> None:
@@ -44,7 +44,7 @@ def getinterval(engine: Engine) -> None:
             engine.opush(obj.new_sub(ind.value, count.value))
 
         case _:
-            raise Tilted("typecheck", f"got {type(obj)}")
+            raise Tilted("typecheck", "got {}", type(obj))
 
 @operator
 def length(engine: Engine) -> None:
@@ -57,7 +57,7 @@ def length(engine: Engine) -> None:
             engine.opush(from_py(len(o.value)))
 
         case _:
-            raise Tilted("typecheck", f"got {type(o)}")
+            raise Tilted("typecheck", "got {}", type(o))
 
 @operator
 def put(engine: Engine) -> None:
@@ -66,12 +66,12 @@ def put(engine: Engine) -> None:
         case Array():
             typecheck(Integer, ind)
             rangecheck(0, ind.value, len(obj.value)-1)
-            engine.prep_for_change(obj)
+            engine.prep_for_change(obj, (elt,))
             obj[ind.value] = elt
 
         case Dict():
             typecheck(Stringy, ind)
-            engine.prep_for_change(obj)
+            engine.prep_for_change(obj, (elt,))
             obj[ind.str_value] = elt
 
         case String():
@@ -81,7 +81,7 @@ def put(engine: Engine) -> None:
             obj[ind.value] = elt.value
 
         case _:
-            raise Tilted("typecheck", f"got {type(obj)}")
+            raise Tilted("typecheck", "got {}", type(obj))
 
 @operator
 def putinterval(engine: Engine) -> None:
@@ -93,8 +93,10 @@ def putinterval(engine: Engine) -> None:
                 raise Tilted("rangecheck")
             if not (ind.value + obj2.length <= obj1.length):
                 raise Tilted("rangecheck")
-            for i in range(obj2.length):
-                obj1[ind.value + i] = obj2[i]
+            objs = obj2.contents()
+            if isinstance(obj1, Array):
+                engine.prep_for_change(obj1, objs)
+            obj1.put_contents(ind.value, objs)
 
         case _:
-            raise Tilted("typecheck", f"got {type(obj1)}")
+            raise Tilted("typecheck", "got {}", type(obj1))
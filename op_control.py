@@ -1,10 +1,8 @@
 """Built-in control operators for stilted."""
 
-import sys
 from dataclasses import dataclass
-from typing import Iterator
 
-from error import Tilted
+from error import StiltedQuit, Tilted
 from evaluate import operator, Engine, Exitable
 from dtypes import (
     from_py, typecheck, typecheck_procedure,
@@ -18,6 +16,10 @@ def exec_(engine: Engine) -> None:
     obj = engine.opop()
     engine.exec(obj)
 
+@operator
+def countexecstack(engine: Engine) -> None:
+    engine.opush(from_py(len(engine.estack)))
+
 @operator("exit")
 def exit_(engine: Engine) -> None:
     # Find the object with .exitable on the stack.
@@ -61,47 +63,45 @@ def for_(engine: Engine) -> None:
 @dataclass
 class ForallArrayExec(Exitable):
     """Execstack item for implementing `array {} forall`."""
-    array_iter: Iterator[Object]
+    array: Array
+    pos: int
     proc: Array
 
     def __call__(self, engine: Engine) -> None:
-        try:
-            obj = next(self.array_iter)
-        except StopIteration:
-            return
-        engine.opush(obj)
-        engine.estack.append(self)
-        engine.exec(self.proc)
+        if self.pos < len(self.array):
+            engine.opush(self.array[self.pos])
+            self.pos += 1
+            engine.estack.append(self)
+            engine.exec(self.proc)
 
 @dataclass
 class ForallDictExec(Exitable):
     """Execstack item for implementing `dict {} forall`."""
-    items_iter: Iterator[tuple[str, Object]]
+    items: list[tuple[str, Object]]
+    pos: int
     proc: Array
 
     def __call__(self, engine: Engine) -> None:
-        try:
-            k, v = next(self.items_iter)
-        except StopIteration:
-            return
-        engine.opush(Name(True, k), v)
-        engine.estack.append(self)
-        engine.exec(self.proc)
+        if self.pos < len(self.items):
+            k, v = self.items[self.pos]
+            self.pos += 1
+            engine.opush(Name(True, k), v)
+            engine.estack.append(self)
+            engine.exec(self.proc)
 
 @dataclass
 class ForallStringExec(Exitable):
     """Execstack item for implementing `string {} forall`."""
-    bytes_iter: Iterator[int]
+    string: String
+    pos: int
     proc: Array
 
     def __call__(self, engine: Engine) -> None:
-        try:
-            b = next(self.bytes_iter)
-        except StopIteration:
-            return
-        engine.opush(from_py(b))
-        engine.estack.append(self)
-        engine.exec(self.proc)
+        if self.pos < len(self.string):
+            engine.opush(from_py(self.string[self.pos]))
+            self.pos += 1
+            engine.estack.append(self)
+            engine.exec(self.proc)
 
 @operator
 def forall(engine: Engine) -> None:
@@ -112,13 +112,13 @@ def forall(engine: Engine) -> None:
 
     match o:
         case Array():
-            engine.estack.append(ForallArrayExec(iter(o), proc))
+            engine.estack.append(ForallArrayExec(o, 0, proc))
 
         case Dict():
-            engine.estack.append(ForallDictExec(iter(o.value.items()), proc))
+            engine.estack.append(ForallDictExec(list(o.value.items()), 0, proc))
 
         case String():
-            engine.estack.append(ForallStringExec(iter(o), proc))
+            engine.estack.append(ForallStringExec(o, 0, proc))
 
         case _:
             raise Tilted("typecheck")
@@ -158,7 +158,7 @@ def loop(engine: Engine) -> None:
 
 @operator("quit")
 def quit_(engine: Engine) -> None:
-    sys.exit()
+    raise StiltedQuit()
 
 @dataclass
 class RepeatExec(Exitable):
@@ -34,7 +34,7 @@ def def_(engine: Engine) -> None:
     name, val = engine.opopn(2)
     typecheck(Stringy, name)
     d = engine.dstack[-1]
-    engine.prep_for_change(d)
+    engine.prep_for_change(d, (val,))
     d[name.str_value] = val
 
 @operator
@@ -70,7 +70,7 @@ def store(engine: Engine) -> None:
     d = engine.dstack_dict(k)
     if d is None:
         d = engine.dstack[-1]
-    engine.prep_for_change(d)
+    engine.prep_for_change(d, (o,))
     d[k.str_value] = o
 
 @operator
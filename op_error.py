@@ -9,11 +9,9 @@ from dtypes import from_py, Boolean, Name
 
 @operator(".error")
 def dot_error_(engine: Engine) -> None:
-    serror = engine.builtin_dict("$error")
-    serror["newerror"] = from_py(True)
-    serror["errorname"] = engine.opop()
-    serror["command"] = engine.opop()
-    engine.exec_name("stop")
+    errorname = engine.opop()
+    command = engine.opop()
+    engine.signal_error(errorname, command)
 
 @operator
 def handleerror(engine: Engine) -> None:
@@ -2,7 +2,7 @@
 
 import cairo
 
-from cairo_util import array_to_cmatrix, cmatrix_to_array, has_current_point
+from cairo_util import array_to_new_cmatrix, cmatrix_to_new_array, has_current_point
 from dtypes import Boolean, Dict, Name, Number, String, from_py
 from evaluate import operator, Engine
 
@@ -24,10 +24,8 @@ def currentfont(engine: Engine) -> None:
 @operator
 def findfont(engine: Engine) -> None:
     name = engine.opop(Name)
-    arr = engine.new_array(n=6)
-    cmatrix_to_array(cairo.Matrix(), arr)
     font_dict = {
-        "FontMatrix": arr,
+        "FontMatrix": cmatrix_to_new_array(engine, cairo.Matrix()),
         "FontName": name,
         "FontType": from_py(1),
     }
@@ -37,12 +35,10 @@ def findfont(engine: Engine) -> None:
 def scalefont(engine: Engine) -> None:
     scale = engine.opop(Number).value
     font_dict = engine.opop(Dict).value
-    mtx = array_to_cmatrix(font_dict["FontMatrix"])
+    mtx = array_to_new_cmatrix(font_dict["FontMatrix"])
     mtx.scale(scale, scale)
-    arr = engine.new_array(n=6)
-    cmatrix_to_array(mtx, arr)
     font_dict_scaled = dict(font_dict)
-    font_dict_scaled["FontMatrix"] = arr
+    font_dict_scaled["FontMatrix"] = cmatrix_to_new_array(engine, mtx)
     engine.opush(engine.new_dict(value=font_dict_scaled))
 
 @operator
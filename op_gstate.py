@@ -96,10 +96,8 @@ def setcmykcolor(engine: Engine) -> None:
 def setdash(engine: Engine) -> None:
     arr, offset = engine.opopn(2)
     typecheck(Array, arr)
-    typecheck(Number, *arr)
     typecheck(Number, offset)
-    nums = [a.value for a in arr]
-    engine.gctx.set_dash(nums, offset.value)
+    engine.gctx.set_dash(arr.numbers(), offset.value)
 
 @operator
 def setflat(engine: Engine) -> None:
@@ -156,4 +154,9 @@ def setrgbcolor(engine: Engine) -> None:
 
 @operator
 def showpage(engine: Engine) -> None:
-    engine.device.show_page()
+    engine.write_page(engine.device.end_page())
+    if engine.checkpoint_file is not None:
+        # The checkpoint shouldn't get ahead of the pages written.
+        engine.wait_for_pages()
+        import checkpoint
+        checkpoint.save_checkpoint(engine, engine.checkpoint_file)
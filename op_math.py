@@ -1,21 +1,50 @@
 """Built-in math operators for stilted."""
 
 import math
+from typing import Any
 
 from error import Tilted
 from evaluate import operator, Engine
-from dtypes import from_py, Integer, Number
+from dtypes import (
+    from_py, int_or_real, typecheck,
+    Integer, Number, Real,
+)
+
+
+def pop_numbers(engine: Engine) -> tuple[Any, Any]:
+    """
+    Remove the top two operands, which must be numbers, and return them.
+
+    The operands are checked before they are removed, so the operators using
+    this must not raise errors after calling it.
+    """
+    engine.ohas(2)
+    stack = engine.ostack
+    a, b = stack[-2:]
+    if not (isinstance(a, (Integer, Real)) and isinstance(b, (Integer, Real))):
+        typecheck(Number, a, b)
+    del stack[-2:]
+    return a, b
 
 
 @operator("abs")
 def abs_(engine: Engine) -> None:
-    a = engine.opop(Number)
-    engine.opush(from_py(abs(a.value)))
+    a = engine.otop()
+    stack = engine.ostack
+    if type(a) is Integer:
+        stack[-1] = int_or_real(abs(a.value))
+    elif type(a) is Real:
+        stack[-1] = Real(True, abs(a.value))
+    else:
+        typecheck(Number, a)
 
 @operator
 def add(engine: Engine) -> None:
-    a, b = engine.opopn(2, Number)
-    engine.opush(from_py(a.value + b.value))
+    a, b = pop_numbers(engine)
+    if type(a) is Integer and type(b) is Integer:
+        engine.ostack.append(int_or_real(a.value + b.value))
+    else:
+        engine.ostack.append(Real(True, a.value + b.value))
 
 @operator
 def atan(engine: Engine) -> None:
@@ -38,8 +67,13 @@ def cos(engine: Engine) -> None:
 
 @operator
 def div(engine: Engine) -> None:
-    a, b = engine.opopn(2, Number)
-    engine.opush(from_py(a.value / b.value))
+    engine.ohas(2)
+    b = engine.ostack[-1]
+    if isinstance(b, (Integer, Real)) and b.value == 0:
+        typecheck(Number, engine.ostack[-2])
+        raise Tilted("undefinedresult")
+    a, b = pop_numbers(engine)
+    engine.ostack.append(Real(True, a.value / b.value))
 
 @operator
 def exp(engine: Engine) -> None:
@@ -73,13 +107,22 @@ def mod(engine: Engine) -> None:
 
 @operator
 def mul(engine: Engine) -> None:
-    a, b = engine.opopn(2, Number)
-    engine.opush(from_py(a.value * b.value))
+    a, b = pop_numbers(engine)
+    if type(a) is Integer and type(b) is Integer:
+        engine.ostack.append(int_or_real(a.value * b.value))
+    else:
+        engine.ostack.append(Real(True, a.value * b.value))
 
 @operator
 def neg(engine: Engine) -> None:
-    a = engine.opop(Number)
-    engine.opush(from_py(-a.value))
+    a = engine.otop()
+    stack = engine.ostack
+    if type(a) is Integer:
+        stack[-1] = int_or_real(-a.value)
+    elif type(a) is Real:
+        stack[-1] = Real(True, -a.value)
+    else:
+        typecheck(Number, a)
 
 @operator
 def rand(engine: Engine) -> None:
@@ -123,8 +166,11 @@ def srand(engine: Engine) -> None:
 
 @operator
 def sub(engine: Engine) -> None:
-    a, b = engine.opopn(2, Number)
-    engine.opush(from_py(a.value - b.value))
+    a, b = pop_numbers(engine)
+    if type(a) is Integer and type(b) is Integer:
+        engine.ostack.append(int_or_real(a.value - b.value))
+    else:
+        engine.ostack.append(Real(True, a.value - b.value))
 
 @operator
 def truncate(engine: Engine) -> None:
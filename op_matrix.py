@@ -1,9 +1,14 @@
 """Built-in matrix and coordinate operators for stilted."""
 
+import array
+
 import cairo
 
-from cairo_util import array_to_cmatrix, cmatrix_to_array
-from dtypes import from_py, Array, Real, Integer, Number
+from cairo_util import (
+    array_to_cmatrix, array_to_inverse_cmatrix, cmatrix_to_array,
+    cmatrix_to_new_array,
+)
+from dtypes import from_py, Array, Real, Integer, Number, Vector
 from error import Tilted
 from evaluate import operator, Engine
 from util import deg_to_rad
@@ -15,29 +20,69 @@ def pop_matrix(engine: Engine) -> Array:
         raise Tilted("rangecheck")
     return arr
 
+def transform_matrix(engine: Engine, arr: Array | None, invert: bool) -> cairo.Matrix:
+    """
+    Get the matrix to transform with: `arr`, or the CTM if `arr` is None.
+
+    If `invert` is true, the inverse is returned.  The result might be cached
+    with `arr`, so don't change it.
+    """
+    if arr is not None:
+        if invert:
+            return array_to_inverse_cmatrix(arr)
+        return array_to_cmatrix(arr)
+    mtx = engine.gctx.get_matrix()
+    if invert:
+        try:
+            mtx.invert()
+        except cairo.Error:
+            raise Tilted("undefinedresult")
+    return mtx
+
 def transform_help(engine: Engine, *, invert: bool, distance: bool) -> None:
     """Code common to the four xxtransform operators."""
     match engine.otop():
         case Array():
-            mtx = array_to_cmatrix(pop_matrix(engine))
+            mtx = transform_matrix(engine, pop_matrix(engine), invert)
 
         case Integer() | Real():
-            mtx = engine.gctx.get_matrix()
+            mtx = transform_matrix(engine, None, invert)
 
         case _:
             raise Tilted("typecheck")
 
-    if invert:
-        try:
-            mtx.invert()
-        except cairo.Error:
-            raise Tilted("undefinedresult")
-
     fn = mtx.transform_distance if distance else mtx.transform_point
     x, y = engine.opopn(2, Number)
     x, y = fn(x.value, y.value)
     engine.opush(from_py(x), from_py(y))
 
+def transform_points_help(engine: Engine, *, invert: bool, distance: bool) -> None:
+    """
+    Code common to the four .xxtransformpoints operators.
+
+    These take an array or vector of x, y pairs, and a matrix.  The matrix
+    isn't optional as it is for `transform`: both operands are arrays, so
+    there'd be no telling them apart.  Use `matrix currentmatrix` for the
+    CTM.  A new array (or vector) of the transformed points is pushed.
+    """
+    mtx = transform_matrix(engine, pop_matrix(engine), invert)
+    points = engine.opop(Array)
+    nums = points.numbers()
+    if len(nums) % 2:
+        raise Tilted("rangecheck", "odd number of coordinates: {}", len(nums))
+
+    xx, yx, xy, yy, x0, y0 = mtx     # type: ignore
+    if distance:
+        x0 = y0 = 0.0
+    xs, ys = nums[0::2], nums[1::2]
+    result = array.array("d", bytes(8 * len(nums)))
+    result[0::2] = array.array("d", [xx * x + xy * y + x0 for x, y in zip(xs, ys)])
+    result[1::2] = array.array("d", [yx * x + yy * y + y0 for x, y in zip(xs, ys)])
+    if isinstance(points, Vector):
+        engine.opush(engine.new_vector(result))
+    else:
+        engine.opush(engine.new_array(value=result))
+
 
 @operator
 def concat(engine: Engine) -> None:
@@ -70,6 +115,10 @@ def defaultmatrix(engine: Engine) -> None:
 def dtransform(engine: Engine) -> None:
     transform_help(engine, invert=False, distance=True)
 
+@operator(".dtransformpoints")
+def dtransformpoints_(engine: Engine) -> None:
+    transform_points_help(engine, invert=False, distance=True)
+
 @operator
 def identmatrix(engine: Engine) -> None:
     arr = pop_matrix(engine)
@@ -80,6 +129,10 @@ def identmatrix(engine: Engine) -> None:
 def idtransform(engine: Engine) -> None:
     transform_help(engine, invert=True, distance=True)
 
+@operator(".idtransformpoints")
+def idtransformpoints_(engine: Engine) -> None:
+    transform_points_help(engine, invert=True, distance=True)
+
 @operator
 def initmatrix(engine: Engine) -> None:
     engine.gctx.set_matrix(engine.device.default_matrix)
@@ -88,23 +141,20 @@ def initmatrix(engine: Engine) -> None:
 def invertmatrix(engine: Engine) -> None:
     arr2 = pop_matrix(engine)
     arr1 = pop_matrix(engine)
-    mtx1 = array_to_cmatrix(arr1)
-    try:
-        mtx1.invert()
-    except cairo.Error:
-        raise Tilted("undefinedresult")
-    cmatrix_to_array(mtx1, arr2)
+    cmatrix_to_array(array_to_inverse_cmatrix(arr1), arr2)
     engine.opush(arr2)
 
 @operator
 def itransform(engine: Engine) -> None:
     transform_help(engine, invert=True, distance=False)
 
+@operator(".itransformpoints")
+def itransformpoints_(engine: Engine) -> None:
+    transform_points_help(engine, invert=True, distance=False)
+
 @operator
 def matrix(engine: Engine) -> None:
-    arr = engine.new_array(n=6)
-    cmatrix_to_array(cairo.Matrix(), arr)
-    engine.opush(arr)
+    engine.opush(cmatrix_to_new_array(engine, cairo.Matrix()))
 
 @operator
 def rotate(engine: Engine) -> None:
@@ -147,6 +197,10 @@ def setmatrix(engine: Engine) -> None:
 def transform(engine: Engine) -> None:
     transform_help(engine, invert=False, distance=False)
 
+@operator(".transformpoints")
+def transformpoints_(engine: Engine) -> None:
+    transform_points_help(engine, invert=False, distance=False)
+
 @operator
 def translate(engine: Engine) -> None:
     match engine.otop():
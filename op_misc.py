@@ -4,6 +4,7 @@ import time
 
 from dtypes import from_py, Array, Name, Operator
 from evaluate import operator, Engine
+from optimize import fold_procedure
 
 @operator
 def bind(engine: Engine) -> None:
@@ -22,6 +23,8 @@ def bind(engine: Engine) -> None:
 
     proc = engine.opop(Array)
     bind_proc(proc)
+    if engine.fold_constants and not proc.literal:
+        proc = fold_procedure(engine, proc)
     engine.opush(proc)
 
 @operator
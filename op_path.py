@@ -1,7 +1,6 @@
 """Built-in path construction operators for Stilted."""
 
 from dataclasses import dataclass
-from typing import Any, Iterator
 
 import cairo
 
@@ -88,24 +87,27 @@ def newpath(engine: Engine) -> None:
 @dataclass
 class PathforallExec(Exitable):
     """Execstack item for implementing `pathforall`."""
-    segment_iter: Iterator[Any]
+    segments: list[tuple[int, tuple[float, ...]]]
+    pos: int
     procs: list[Array]
 
     def __init__(self, engine: Engine, procs: list[Array]) -> None:
-        self.segment_iter = iter(enumerate(engine.gctx.copy_path()))
+        self.segments = list(engine.gctx.copy_path())
+        self.pos = 0
         self.procs = procs
 
     def __call__(self, engine: Engine) -> None:
-        try:
-            iseg, (kind, nums) = next(self.segment_iter)
-        except StopIteration:
+        if self.pos >= len(self.segments):
             return
+        iseg = self.pos
+        kind, nums = self.segments[iseg]
+        self.pos += 1
         # Cairo always puts a moveto after a closepath, but PostScript does not.
         # If we have a closepath and it wasn't made by charpath, swallow the
         # moveto after it.
         if kind == 3:
             if all(not (begin <= iseg < end) for begin, end in engine.gextra.charpath_segments):
-                next(self.segment_iter)
+                self.pos += 1
         engine.opush(*map(from_py, nums))
         engine.estack.append(self)
         engine.exec(self.procs[kind])
@@ -0,0 +1,67 @@
+"""
+Built-in resource operators for stilted.
+
+Resources are named objects in categories, like `ProcSet`.  Resources defined
+in global VM are shared by every engine using the same GlobalVM, so a prologue
+defined once as a ProcSet can be found by every job.  Stilted doesn't load
+resources from files: only defined resources can be found.
+"""
+
+from error import Tilted
+from evaluate import operator, Engine
+from dtypes import from_py, typecheck, Dict, Object, Stringy
+
+
+def find_resource(engine: Engine, key: str, category: str) -> Object | None:
+    """Find a resource, in local VM first, then in global VM."""
+    for resources in [engine.resources, engine.global_vm.resources]:
+        instances = resources.value.get(category)
+        if isinstance(instances, Dict) and key in instances:
+            return instances[key]
+    return None
+
+
+@operator
+def defineresource(engine: Engine) -> None:
+    key, instance, category = engine.opopn(3)
+    typecheck(Stringy, key, category)
+    resources = engine.global_vm.resources if engine.vm_global else engine.resources
+    instances = resources.value.get(category.str_value)
+    if instances is None:
+        instances = engine.new_dict()
+        engine.prep_for_change(resources, (instances,))
+        resources[category.str_value] = instances
+    assert isinstance(instances, Dict)
+    engine.prep_for_change(instances, (instance,))
+    instances[key.str_value] = instance
+    engine.opush(instance)
+
+@operator
+def findresource(engine: Engine) -> None:
+    key, category = engine.opopn(2)
+    typecheck(Stringy, key, category)
+    instance = find_resource(engine, key.str_value, category.str_value)
+    if instance is None:
+        raise Tilted("undefinedresource", "{} {}", category.str_value, key.str_value)
+    engine.opush(instance)
+
+@operator
+def resourcestatus(engine: Engine) -> None:
+    key, category = engine.opopn(2)
+    typecheck(Stringy, key, category)
+    instance = find_resource(engine, key.str_value, category.str_value)
+    if instance is None:
+        engine.opush(from_py(False))
+    else:
+        # Status 0: the resource is defined in VM.  The size isn't known.
+        engine.opush(from_py(0), from_py(-1), from_py(True))
+
+@operator
+def undefineresource(engine: Engine) -> None:
+    key, category = engine.opopn(2)
+    typecheck(Stringy, key, category)
+    resources = engine.global_vm.resources if engine.vm_global else engine.resources
+    instances = resources.value.get(category.str_value)
+    if isinstance(instances, Dict) and key.str_value in instances:
+        engine.prep_for_change(instances)
+        del instances.value[key.str_value]
@@ -1,5 +1,7 @@
 """Built-in stack operators for stilted."""
 
+from typing import cast
+
 from error import Tilted
 from evaluate import operator, Engine
 from dtypes import (
@@ -11,38 +13,42 @@ from util import rangecheck
 
 @operator
 def clear(engine: Engine) -> None:
-    engine.ostack.clear()
+    engine.otrim(0)
 
 @operator
 def cleartomark(engine: Engine) -> None:
-    n = engine.counttomark()
-    del engine.ostack[-(n + 1):]
+    engine.counttomark()
+    engine.otrim(engine.marks[-1])
 
 @operator
 def copy(engine: Engine) -> None:
-    if isinstance(engine.otop(), Integer):
-        n = engine.opop().value
-        rangecheck(0, n)
-        if n > 0:
-            engine.ohas(n)
-            engine.opush(*engine.ostack[-n:])
+    if isinstance(n := engine.otop(), Integer):
+        rangecheck(0, n.value)
+        engine.ohas(n.value + 1)
+        stack = engine.ostack
+        stack.pop()
+        base = len(stack) - n.value
+        stack.extend(stack[base:])
+        engine.refind_marks(base)
     else:
         obj1, obj2 = engine.opopn(2)
         match obj1, obj2:
             case Dict(), Dict():
-                engine.prep_for_change(obj2)
+                engine.prep_for_change(obj2, obj1.value.values())
                 for k, v in obj1.value.items():
                     obj2[k] = v
                 engine.opush(obj2)
 
             case (Array(), Array()) | (String(), String()):
                 rangecheck(obj1.length, obj2.length)
-                for i in range(obj1.length):
-                    obj2[i] = obj1[i]
+                objs = obj1.contents()
+                if isinstance(obj2, Array):
+                    engine.prep_for_change(obj2, objs)
+                obj2.put_contents(0, objs)
                 engine.opush(obj2.new_sub(0, obj1.length))
 
             case _:
-                raise Tilted("typecheck", f"got {type(obj1)}, {type(obj2)}")
+                raise Tilted("typecheck", "got {}, {}", type(obj1), type(obj2))
 
 @operator
 def count(engine: Engine) -> None:
@@ -58,15 +64,21 @@ def dup(engine: Engine) -> None:
 
 @operator
 def exch(engine: Engine) -> None:
-    a, b = engine.opopn(2)
-    engine.opush(b, a)
+    engine.ohas(2)
+    stack = engine.ostack
+    stack[-1], stack[-2] = stack[-2], stack[-1]
+    engine.refind_marks(len(stack) - 2)
 
 @operator
 def index(engine: Engine) -> None:
-    n = engine.opop(Integer)
-    engine.ohas(n.value + 1)
+    n = cast(Integer, engine.otop())
+    typecheck(Integer, n)
+    engine.ohas(n.value + 2)
     rangecheck(0, n.value)
-    engine.opush(engine.ostack[-(n.value + 1)])
+    stack = engine.ostack
+    stack[-1] = stack[-(n.value + 2)]
+    if stack[-1] is MARK:
+        engine.marks.append(len(stack) - 1)
 
 @operator
 def mark(engine: Engine) -> None:
@@ -78,8 +90,19 @@ def pop(engine: Engine) -> None:
 
 @operator
 def roll(engine: Engine) -> None:
-    n, j = engine.opopn(2)
+    engine.ohas(2)
+    stack = engine.ostack
+    n, j = cast(list[Integer], stack[-2:])
     typecheck(Integer, n, j)
-    vals = engine.opopn(n.value)
-    engine.opush(*vals[-j.value:])
-    engine.opush(*vals[:-j.value])
+    rangecheck(0, n.value)
+    engine.ohas(n.value + 2)
+    del stack[-2:]
+    if n.value == 0:
+        return
+    # Rotate the top n elements in place: move the top k to the bottom.
+    k = j.value % n.value
+    if k:
+        base = len(stack) - n.value
+        stack[base:base] = stack[-k:]
+        del stack[-k:]
+        engine.refind_marks(base)
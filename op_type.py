@@ -1,17 +1,33 @@
 """Built-in type/attribute/conversion operators for Stilted."""
 
+import copy
 import string
 
 from error import Tilted
 from evaluate import operator, Engine
 from dtypes import (
     from_py, typecheck,
-    Integer, Name, Number, Object, Real, String,
+    Integer, MARK, Name, Number, Object, Real, String,
 )
 from lex import lexer
 from util import rangecheck
 
 
+def set_literal(engine: Engine, literal: bool) -> None:
+    """
+    Make the top operand literal or executable.
+
+    The object can be shared (systemdict's operators, `true`, an array stored
+    in a dict), so the top operand is replaced by a changed copy rather than
+    changed in place.  The mark is left as it is, since marks on the operand
+    stack are found by identity.
+    """
+    obj = engine.otop()
+    if obj.literal != literal and obj is not MARK:
+        obj = copy.copy(obj)
+        obj.literal = literal
+        engine.ostack[-1] = obj
+
 @operator
 def cvi(engine: Engine) -> None:
     obj = engine.opop()
@@ -29,7 +45,7 @@ def cvi(engine: Engine) -> None:
 
 @operator
 def cvlit(engine: Engine) -> None:
-    engine.otop().literal = True
+    set_literal(engine, True)
 
 @operator
 def cvn(engine: Engine) -> None:
@@ -87,7 +103,7 @@ def cvs(engine: Engine) -> None:
 
 @operator
 def cvx(engine: Engine) -> None:
-    engine.otop().literal = False
+    set_literal(engine, False)
 
 @operator("type")
 def type_(engine: Engine) -> None:
@@ -0,0 +1,116 @@
+"""
+Vector operators for stilted.
+
+Vectors are arrays of numbers stored compactly.  These operators aren't part
+of PostScript: they work on whole vectors at once, so that a program can do
+arithmetic on thousands of numbers without a `forall` loop.
+"""
+
+import array
+import itertools
+import operator as pyop
+from typing import Any, Callable, Iterable, cast
+
+from error import Tilted
+from evaluate import operator, Engine
+from dtypes import (
+    int_or_real, typecheck,
+    Array, Integer, Number, Object, Real, Vector, MAX_INT, MIN_INT,
+)
+
+
+def numbers_of(obj: Object, length: int) -> Iterable[int | float]:
+    """Get the numbers from a vector, or a number repeated `length` times."""
+    if isinstance(obj, Vector):
+        return obj.numbers()
+    return itertools.repeat(cast(Integer | Real, obj).value, length)
+
+def is_integral(obj: Object) -> bool:
+    """Is `obj` an Integer, or a Vector of integers?"""
+    if isinstance(obj, Vector):
+        return obj.typecode == "q"
+    return isinstance(obj, Integer)
+
+def elementwise(engine: Engine, fn: Callable[[Any, Any], Any]) -> None:
+    """
+    Apply `fn` to two vectors element by element.
+
+    Either operand can be a number instead, which is used with every element
+    of the other.  If both operands are integral, the result is a vector of
+    integers, unless some result is too large for an integer.
+    """
+    a, b = engine.opopn(2)
+    if not isinstance(a, Vector) and not isinstance(b, Vector):
+        raise Tilted("typecheck", "expected a vector")
+    for obj in [a, b]:
+        if not isinstance(obj, Vector):
+            typecheck(Number, obj)
+    if isinstance(a, Vector) and isinstance(b, Vector):
+        if len(a) != len(b):
+            raise Tilted("rangecheck", "vector lengths {} and {}", len(a), len(b))
+    length = len(a) if isinstance(a, Vector) else len(b)
+    try:
+        results = list(map(fn, numbers_of(a, length), numbers_of(b, length)))
+    except ZeroDivisionError:
+        raise Tilted("undefinedresult")
+    if is_integral(a) and is_integral(b) and fn is not pyop.truediv:
+        if not results or (min(results) >= MIN_INT and max(results) <= MAX_INT):
+            engine.opush(engine.new_vector(array.array("q", results)))
+            return
+    engine.opush(engine.new_vector(array.array("d", results)))
+
+
+@operator(".tovector")
+def tovector_(engine: Engine) -> None:
+    arr = engine.opop(Array)
+    objs = arr.contents()
+    typecheck(Number, *objs)
+    if all(type(obj) is Integer and MIN_INT <= obj.value <= MAX_INT for obj in objs):
+        nums = array.array("q", (obj.value for obj in objs))
+    else:
+        nums = array.array("d", (obj.value for obj in objs))
+    engine.opush(engine.new_vector(nums))
+
+@operator(".toarray")
+def toarray_(engine: Engine) -> None:
+    vec = engine.opop(Vector)
+    engine.opush(engine.new_array(value=vec.contents()))
+
+@operator(".vadd")
+def vadd_(engine: Engine) -> None:
+    elementwise(engine, pyop.add)
+
+@operator(".vdiv")
+def vdiv_(engine: Engine) -> None:
+    elementwise(engine, pyop.truediv)
+
+@operator(".vmax")
+def vmax_(engine: Engine) -> None:
+    vec = engine.opop(Vector)
+    if not len(vec):
+        raise Tilted("rangecheck", "empty vector")
+    engine.opush(vec.box(max(vec.numbers())))
+
+@operator(".vmin")
+def vmin_(engine: Engine) -> None:
+    vec = engine.opop(Vector)
+    if not len(vec):
+        raise Tilted("rangecheck", "empty vector")
+    engine.opush(vec.box(min(vec.numbers())))
+
+@operator(".vmul")
+def vmul_(engine: Engine) -> None:
+    elementwise(engine, pyop.mul)
+
+@operator(".vsub")
+def vsub_(engine: Engine) -> None:
+    elementwise(engine, pyop.sub)
+
+@operator(".vsum")
+def vsum_(engine: Engine) -> None:
+    vec = engine.opop(Vector)
+    total = sum(vec.numbers())
+    if vec.typecode == "q":
+        engine.opush(int_or_real(total))
+    else:
+        engine.opush(Real(True, float(total)))
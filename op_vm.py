@@ -2,7 +2,16 @@
 
 from error import Tilted
 from evaluate import operator, Engine
-from dtypes import Save, SaveableObject
+from dtypes import from_py, Boolean, Save, SaveableObject
+
+@operator
+def currentglobal(engine: Engine) -> None:
+    engine.opush(from_py(engine.vm_global))
+
+@operator
+def gcheck(engine: Engine) -> None:
+    obj = engine.opop()
+    engine.opush(from_py(engine.gcheck(obj)))
 
 @operator
 def restore(engine: Engine) -> None:
@@ -10,12 +19,14 @@ def restore(engine: Engine) -> None:
     if not s.is_valid:
         raise Tilted("invalidrestore")
     assert s in engine.sstack
+    n_restored = 0
     for save_obj in reversed(engine.sstack):
         for obj in save_obj.changed_objs:
             if obj.values[-1][0] is save_obj:
                 obj.values.pop()
         engine.sstack.pop()
         save_obj.is_valid = False
+        n_restored += 1
         if save_obj is s:
             break
 
@@ -26,10 +37,19 @@ def restore(engine: Engine) -> None:
                 if o.storage.values[0][0].serial >= s.serial:
                     raise Tilted("invalidrestore")
 
-    # Roll back the gstack also.
-    engine.grestoreall()
+    # Roll back the gstack also, to the gstate saved with `s`. Each save
+    # pushed a gstate, so they are all removed.
+    for _ in range(n_restored):
+        while not engine.gstack[-1].from_save:
+            engine.gstack.pop()
+        gsx = engine.gstack.pop()
+    engine.restore_gstate(gsx)
 
 @operator
 def save(engine: Engine) -> None:
     engine.opush(engine.new_save())
     engine.gsave(from_save=True)
+
+@operator
+def setglobal(engine: Engine) -> None:
+    engine.vm_global = engine.opop(Boolean).value
@@ -0,0 +1,154 @@
+"""Optimization of bound procedures for Stilted."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from error import Tilted
+from dtypes import Array, Boolean, Integer, Name, Object, Operator, Real
+if TYPE_CHECKING:   # pragma: no cover
+    from evaluate import Engine
+
+
+# Operators that only compute results from their operands. They have no side
+# effects and allocate nothing a program could observe, so if their operands
+# are all constants, they can be run once when the procedure is bound.
+PURE_OPERATORS = {
+    # op_math.py
+    "abs", "add", "atan", "ceiling", "cos", "div", "exp", "floor", "idiv",
+    "mod", "mul", "neg", "round", "sin", "sqrt", "sub", "truncate",
+    # op_relational.py
+    "and", "bitshift", "eq", "ge", "gt", "le", "lt", "ne", "not", "or", "xor",
+    # op_stack.py
+    "copy", "dup", "exch", "index", "pop", "roll",
+}
+
+
+def is_constant(obj: Object) -> bool:
+    """Is `obj` a simple value that can be computed with at bind time?"""
+    return isinstance(obj, (Integer, Real, Boolean))
+
+
+def is_builtin(obj: Object, names: set[str]) -> bool:
+    """Is `obj` the built-in operator for one of `names`?"""
+    from evaluate import SYSTEMDICT
+    return (
+        isinstance(obj, Operator)
+        and obj.name in names
+        and SYSTEMDICT.get(obj.name) is obj
+    )
+
+
+def fold_procedure(engine: Engine, proc: Array) -> Array:
+    """
+    Fold constant computations in a bound procedure.
+
+    Runs of literal numbers and booleans followed by pure operators are
+    replaced by their results, and `if`/`ifelse` with a constant condition
+    are replaced by the body that would run.  The names `true` and `false` are
+    treated as constants if they currently have their built-in values, the
+    same way `bind` treats operator names.
+
+    Procedures can't change length, so if anything was folded, a new
+    executable array is returned.  Otherwise `proc` itself is returned.
+
+    """
+    from evaluate import SYSTEMDICT
+    folded: list[Object] = []
+    changed = False
+    pending = list(proc)[::-1]
+    while pending:
+        elt = pending.pop()
+        match elt:
+            case Array(literal=False):
+                sub = fold_procedure(engine, elt)
+                if sub is not elt:
+                    changed = True
+                folded.append(sub)
+
+            case Name(literal=False, value="true" | "false"):
+                val = engine.dstack_value(elt)
+                if val is SYSTEMDICT[elt.value]:
+                    folded.append(val)
+                    changed = True
+                else:
+                    folded.append(elt)
+
+            case Operator() if is_builtin(elt, {"if", "ifelse"}):
+                body = constant_branch(folded, elt)
+                if body is None:
+                    folded.append(elt)
+                else:
+                    pending.extend(body[::-1])
+                    changed = True
+
+            case Operator() if is_builtin(elt, PURE_OPERATORS):
+                nconst = 0
+                while nconst < len(folded) and is_constant(folded[-(nconst + 1)]):
+                    nconst += 1
+                results = run_pure(engine, elt, folded[len(folded) - nconst:])
+                if results is None:
+                    folded.append(elt)
+                else:
+                    del folded[len(folded) - nconst:]
+                    folded.extend(results)
+                    changed = True
+
+            case _:
+                folded.append(elt)
+
+    if not changed:
+        return proc
+    return engine.new_array(value=folded, literal=False)
+
+
+def constant_branch(folded: list[Object], op: Operator) -> list[Object] | None:
+    """
+    Decide an `if` or `ifelse` at bind time.
+
+    `folded` is the procedure so far.  If it ends with a constant condition
+    and literal procedures, they are removed from `folded` and the contents of
+    the procedure that will be run are returned (nothing for a false `if`).
+    Otherwise, None is returned and `folded` is unchanged.
+
+    """
+    nprocs = 1 if op.name == "if" else 2
+    if len(folded) < nprocs + 1:
+        return None
+    cond = folded[-(nprocs + 1)]
+    procs = folded[len(folded) - nprocs:]
+    if not isinstance(cond, Boolean):
+        return None
+    if not all(isinstance(p, Array) and not p.literal for p in procs):
+        return None
+    del folded[-(nprocs + 1):]
+    if cond.value:
+        return list(procs[0])   # type: ignore
+    elif nprocs == 2:
+        return list(procs[1])   # type: ignore
+    else:
+        return []
+
+
+def run_pure(engine: Engine, op: Operator, operands: list[Object]) -> list[Object] | None:
+    """
+    Run a pure operator on constant operands, returning the new stack.
+
+    If the operator fails, or produces something that isn't a constant,
+    return None: the operator will be left in place to run normally.
+
+    """
+    if not operands:
+        return None
+    ostack, marks, popped = engine.ostack, engine.marks, engine.popped
+    scratch = list(operands)
+    engine.ostack, engine.marks, engine.popped = scratch, [], []
+    try:
+        op.value(engine)
+    except (Tilted, ArithmeticError, ValueError):
+        return None
+    finally:
+        engine.ostack, engine.marks, engine.popped = ostack, marks, popped
+    if not all(map(is_constant, scratch)):
+        return None
+    return scratch
@@ -0,0 +1,378 @@
+"""
+A long-running render server for Stilted, with warm engines.
+
+Requests are JSON objects, one per line, and each gets one line of JSON back.
+A render job gives the code to run, or a file to read it from, and where to
+write its pages:
+
+    {"id": 1, "code": "0 0 moveto 100 100 lineto stroke showpage", "outfile": "one.svg"}
+    {"id": 1, "status": "ok", "output": "", "seconds": 0.0021}
+
+The status is "ok", "error" (with the error name and command), "quit" if the
+job ran `quit`, or "crash" if Stilted itself failed.  Anything the job prints
+is in "output".  Without "outfile", pages are drawn but not written.
+
+    {"op": "stats"}
+
+gets the number of jobs done, the queue depth, and latency percentiles.
+
+The engines are made once and reused.  Each job runs inside a `save` that is
+restored when the job ends, and the stacks are emptied.  `restore` doesn't
+undo changes to strings, so the strings that were there before the first job
+are put back as they were, and the random number generator is started afresh.
+Jobs can see what earlier jobs did only in global VM, which is shared by all
+the engines.
+
+Run the server on stdin and stdout, or on a Unix socket:
+
+    $ python server.py
+    $ python server.py --socket /tmp/stilted.sock
+
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import concurrent.futures
+import io
+import json
+import math
+import pathlib
+import queue
+import random
+import socket
+import socketserver
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, TextIO
+
+from dtypes import Array, Boolean, Dict, Object, Save, String
+from error import StiltedQuit
+from evaluate import Engine
+from extension import Extension, find_extensions
+from globalvm import GlobalVM
+
+
+@dataclass
+class WarmEngine:
+    """An Engine kept ready to run jobs, one at a time."""
+    engine: Engine
+
+    # The save made before each job, restored after it.
+    base: Save
+
+    # The dict stack depth to return to after each job.
+    dstack_depth: int
+
+    # The data of the strings made before the jobs, and their contents then.
+    strings: list[tuple[bytearray, bytes]]
+
+    @classmethod
+    def make(cls, prologue: str | None=None, **engine_kwargs) -> WarmEngine:
+        """Make an Engine, run `prologue` in it, and make it ready for jobs."""
+        engine = Engine(outfile=None, **engine_kwargs)
+        if prologue is not None:
+            engine.exec_text(prologue)
+        engine.exec_text("save")
+        strings = [(data, bytes(data)) for data in local_strings(engine)]
+        return cls(engine, engine.opop(Save), len(engine.dstack), strings)
+
+    def run_job(self, code: str, outfile: str | None=None) -> dict[str, Any]:
+        """Run one job, and then reset the engine for the next."""
+        engine = self.engine
+        engine.stdout = io.StringIO()
+        engine.set_outfile(outfile)
+        result: dict[str, Any] = {"status": "ok"}
+        try:
+            engine.push_string(code)
+            engine.exec_text("cvx stopped")
+            if engine.opop(Boolean).value:
+                result["status"] = "error"
+                result["error"] = engine.take_error()
+                if result["error"] != "stop":
+                    result["command"] = engine.builtin_dict("$error")["command"].op_eqeq()
+        except StiltedQuit:
+            result["status"] = "quit"
+        finally:
+            result["output"] = engine.stdout.getvalue()
+            self.reset()
+        return result
+
+    def reset(self) -> None:
+        """Undo everything the last job did."""
+        engine = self.engine
+        engine.estack.clear()
+        engine.otrim(0)
+        del engine.dstack[self.dstack_depth:]
+        engine.vm_global = False
+        engine.opush(self.base)
+        engine.exec_text("restore save")
+        self.base = engine.opop(Save)
+        for data, contents in self.strings:
+            if data != contents:
+                data[:] = contents
+        engine.random = random.Random()
+
+
+def local_strings(engine: Engine) -> list[bytearray]:
+    """The data of the strings reachable from the engine's local VM."""
+    found: dict[int, bytearray] = {}
+    seen: set[int] = set()
+    todo: list[Object] = [*engine.dstack, engine.resources]
+    while todo:
+        obj = todo.pop()
+        if isinstance(obj, String):
+            found[id(obj.data)] = obj.data
+        elif isinstance(obj, (Array, Dict)) and not engine.gcheck(obj):
+            if id(obj.storage) in seen:
+                continue
+            seen.add(id(obj.storage))
+            if isinstance(obj, Dict):
+                todo.extend(obj.value.values())
+            elif isinstance(obj.value, list):
+                todo.extend(obj.value)
+    return list(found.values())
+
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """The `pct` percentile of `values`, by nearest rank."""
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+class RenderServer:
+    """A pool of warm engines, running jobs from requests."""
+
+    # How many recent job latencies to keep for the statistics.
+    LATENCIES = 1000
+
+    def __init__(
+        self,
+        n_engines: int=1,
+        size: tuple[int, int] | None=None,
+        prologue: str | None=None,
+        extensions: Iterable[Extension | str]=(),
+    ) -> None:
+        self.n_engines = n_engines
+        self.engine_kwargs = dict(
+            size=size,
+            global_vm=GlobalVM(),
+            extensions=list(extensions),
+        )
+        self.prologue = prologue
+        self.pool: queue.SimpleQueue[WarmEngine] = queue.SimpleQueue()
+        for _ in range(n_engines):
+            self.pool.put(self.make_engine())
+
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.jobs = 0
+        self.latencies: collections.deque[float] = collections.deque(maxlen=self.LATENCIES)
+
+    def make_engine(self) -> WarmEngine:
+        return WarmEngine.make(prologue=self.prologue, **self.engine_kwargs)
+
+    def receive(self) -> float:
+        """Count a render request as queued, and return the time it arrived."""
+        with self.lock:
+            self.waiting += 1
+        return time.perf_counter()
+
+    def render(self, request: dict[str, Any], received: float | None=None) -> dict[str, Any]:
+        """Run a render request, waiting for a free engine."""
+        if received is None:
+            received = self.receive()
+        try:
+            if "code" in request:
+                code = request["code"]
+            else:
+                code = pathlib.Path(request["file"]).read_text(encoding="iso8859-1")
+        except (KeyError, OSError) as exc:
+            with self.lock:
+                self.waiting -= 1
+            return {"status": "badrequest", "error": f"No code to run: {exc}"}
+        warm = self.pool.get()
+        with self.lock:
+            self.waiting -= 1
+        start = time.perf_counter()
+        try:
+            result = warm.run_job(code, request.get("outfile"))
+        except Exception as exc:
+            # Who knows what state the engine is in? Replace it.
+            result = {"status": "crash", "error": repr(exc)}
+            warm = self.make_engine()
+        finally:
+            self.pool.put(warm)
+        done = time.perf_counter()
+        result["seconds"] = round(done - start, 6)
+        with self.lock:
+            self.jobs += 1
+            self.latencies.append(done - received)
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        """Statistics about the jobs run, and waiting to run."""
+        with self.lock:
+            stats: dict[str, Any] = {
+                "engines": self.n_engines,
+                "jobs": self.jobs,
+                "queue_depth": self.waiting,
+            }
+            if self.latencies:
+                stats["latency_ms"] = {
+                    f"p{pct}": round(percentile(self.latencies, pct) * 1000, 3)
+                    for pct in [50, 90, 99]
+                }
+        return stats
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Handle any request, and return the response."""
+        op = request.get("op", "render")
+        if op == "render":
+            response = self.render(request)
+        elif op == "stats":
+            response = self.stats()
+        else:
+            response = {"status": "badrequest", "error": f"Unknown op {op!r}"}
+        return with_id(request, response)
+
+    def serve_lines(self, infile: TextIO, outfile: TextIO) -> None:
+        """
+        Serve JSON-lines requests from `infile` until it ends.
+
+        Render jobs run concurrently, one per engine, so responses can be out
+        of order: use "id" to match them up.
+        """
+        write_lock = threading.Lock()
+
+        def respond(response: dict[str, Any]) -> None:
+            with write_lock:
+                outfile.write(json.dumps(response) + "\n")
+                outfile.flush()
+
+        def respond_when_done(request: dict[str, Any], future: concurrent.futures.Future) -> None:
+            future.add_done_callback(lambda f: respond(with_id(request, f.result())))
+
+        with concurrent.futures.ThreadPoolExecutor(self.n_engines) as executor:
+            for line in infile:
+                if not line.strip():
+                    continue
+                try:
+                    request = parse_request(line)
+                except ValueError as exc:
+                    respond({"status": "badrequest", "error": str(exc)})
+                    continue
+                if request.get("op", "render") == "render":
+                    future = executor.submit(self.render, request, self.receive())
+                    respond_when_done(request, future)
+                else:
+                    respond(self.handle(request))
+
+    def serve_socket(self, path: str) -> None:
+        """Serve JSON-lines requests on a Unix socket at `path`, forever."""
+        with self.socket_server(path) as server:
+            server.serve_forever()
+
+    def socket_server(self, path: str) -> socketserver.UnixStreamServer:
+        """Make a socket server for `path`, to run with `serve_forever`."""
+        server = _UnixServer(path, _RequestHandler)
+        server.render_server = self
+        return server
+
+
+def parse_request(line: str) -> dict[str, Any]:
+    """Parse a request line, or raise ValueError."""
+    request = json.loads(line)
+    if not isinstance(request, dict):
+        raise ValueError(f"Request must be an object: {line.strip()!r}")
+    return request
+
+
+def with_id(request: dict[str, Any], response: dict[str, Any]) -> dict[str, Any]:
+    """Give `response` the id of `request`, if it had one."""
+    if "id" in request:
+        response = {"id": request["id"], **response}
+    return response
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    render_server: RenderServer
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handle the requests on one connection, one at a time."""
+    server: _UnixServer
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = self.server.render_server.handle(parse_request(line.decode()))
+            except ValueError as exc:
+                response = {"status": "badrequest", "error": str(exc)}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+def send_requests(path: str, *requests: dict[str, Any]) -> list[dict[str, Any]]:
+    """A simple client: send requests to the server at `path`, and get the responses."""
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.connect(path)
+        with sock.makefile("rwb") as sockfile:
+            responses = []
+            for req in requests:
+                sockfile.write(json.dumps(req).encode() + b"\n")
+                sockfile.flush()
+                responses.append(json.loads(sockfile.readline()))
+    return responses
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        description="Run Stilted jobs from JSON-lines requests, with warm engines.",
+    )
+    parser.add_argument(
+        "--socket", metavar="PATH",
+        help="Listen on a Unix socket instead of stdin/stdout",
+    )
+    parser.add_argument(
+        "-n", dest="n_engines", type=int, default=1,
+        help="The number of engines, to run jobs at once",
+    )
+    parser.add_argument(
+        "-s", dest="size", metavar="WxH", default="612x792",
+        help="The size of the output, WIDTHxHEIGHT, in points",
+    )
+    parser.add_argument(
+        "--prologue", metavar="FILE",
+        help="Code to run in each engine before any jobs",
+    )
+    parser.add_argument(
+        "--ext", metavar="MODULE:NAME", action="append", default=[],
+        help="Load an extension, as well as installed ones (repeatable)",
+    )
+    args = parser.parse_args(argv)
+
+    width, height = map(int, args.size.split("x"))
+    prologue = None
+    if args.prologue is not None:
+        prologue = pathlib.Path(args.prologue).read_text()
+    server = RenderServer(
+        n_engines=args.n_engines,
+        size=(width, height),
+        prologue=prologue,
+        extensions=[*find_extensions(), *args.ext],
+    )
+    if args.socket is not None:
+        server.serve_socket(args.socket)
+    else:
+        server.serve_lines(sys.stdin, sys.stdout)
+    return 0
+
+if __name__ == "__main__":          # pragma: no cover
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,295 @@
+"""
+Render workers that take jobs from a spool directory.
+
+Put PostScript files in a spool directory, and run workers on any machines
+that share it:
+
+    $ python spool.py /shared/spool -n 4
+
+Each worker claims a job by renaming it from the spool directory into
+`claimed/`.  Only one rename can succeed, so only one worker gets each job.
+The pages are written to `out/` (or the -o directory), and when the job is
+done, it moves to `done/` with a JSON record of how it went:
+
+    spool/
+        chart.ps            waiting to be claimed
+        claimed/
+            map.ps@host1-4242       claimed by a worker
+        done/
+            intro.ps
+            intro.ps.json   {"status": "ok", "worker": "host2-77", ...}
+        out/
+            intro-1.svg
+
+A worker touches its claimed file while it works.  If a worker crashes, the
+file stops being touched, and once it is older than the lease, another worker
+puts the job back to be claimed again, unless a new job with the same name has
+been spooled since.  Pages are drawn into a directory of their own in `out/`,
+and only moved into `out/` once the job has moved to `done/`, so if a worker
+outlives its lease and the job is taken away, its pages and record are
+discarded.
+
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import pathlib
+import shutil
+import socket
+import sys
+import threading
+import time
+from typing import Any, Iterable, Iterator
+
+from extension import Extension, extension_specs
+from server import WarmEngine
+
+
+class SpoolWorker:
+    """Claims jobs from a spool directory, and renders them in a warm Engine."""
+
+    def __init__(
+        self,
+        spool: str | os.PathLike,
+        outdir: str | os.PathLike | None=None,
+        format: str="svg",
+        lease: float=60.0,
+        worker_id: str | None=None,
+        size: tuple[int, int] | None=None,
+        prologue: str | None=None,
+        extensions: Iterable[Extension | str]=(),
+    ) -> None:
+        self.spool = pathlib.Path(spool)
+        self.claimed = self.spool / "claimed"
+        self.done = self.spool / "done"
+        self.outdir = pathlib.Path(outdir) if outdir is not None else self.spool / "out"
+        for d in [self.claimed, self.done, self.outdir]:
+            d.mkdir(parents=True, exist_ok=True)
+        self.format = format
+        self.lease = lease
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.engine_kwargs: dict[str, Any] = dict(
+            size=size, prologue=prologue, extensions=list(extensions),
+        )
+        self.warm = WarmEngine.make(**self.engine_kwargs)
+
+    def reclaim_expired(self) -> None:
+        """Put jobs back in the spool if their workers stopped touching them."""
+        now = time.time()
+        for path in self.claimed.glob("*.ps@*"):
+            try:
+                if now - path.stat().st_mtime > self.lease:
+                    job_name = path.name.rpartition("@")[0]
+                    # Rename would replace a new job with the same name, but
+                    # link won't.
+                    os.link(path, self.spool / job_name)
+                    path.unlink()
+            except FileNotFoundError:
+                # Finished, or reclaimed by another worker.
+                pass
+            except FileExistsError:
+                # A new job has the name, or another worker is reclaiming
+                # this one.  Try again later.
+                pass
+
+    def claim(self) -> pathlib.Path | None:
+        """Claim a job, and return its path in `claimed/`, or None if none are waiting."""
+        self.reclaim_expired()
+        for job in sorted(self.spool.glob("*.ps")):
+            claimed = self.claimed / f"{job.name}@{self.worker_id}"
+            try:
+                job.rename(claimed)
+            except FileNotFoundError:
+                # Another worker got it first.
+                continue
+            # The lease starts now, not when the job was written.
+            os.utime(claimed)
+            return claimed
+        return None
+
+    @contextlib.contextmanager
+    def heartbeat(self, claimed: pathlib.Path) -> Iterator[None]:
+        """Keep touching `claimed` while the job runs, to keep the lease."""
+        stop = threading.Event()
+
+        def _touch() -> None:
+            while not stop.wait(self.lease / 4):
+                with contextlib.suppress(FileNotFoundError):
+                    os.utime(claimed)
+
+        thread = threading.Thread(target=_touch, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def render(self, claimed: pathlib.Path) -> dict[str, Any]:
+        """Render a claimed job, and record how it went."""
+        job_name = claimed.name.rpartition("@")[0]
+        stem = job_name.removesuffix(".ps")
+        record: dict[str, Any] = {"job": job_name, "worker": self.worker_id}
+        start = time.perf_counter()
+        record["started"] = time.time()
+        # The pages are drawn here, out of the way of any other worker that
+        # has the job.
+        pages_tmp = self.outdir / f".{claimed.name}"
+        shutil.rmtree(pages_tmp, ignore_errors=True)
+        pages_tmp.mkdir()
+        with self.heartbeat(claimed):
+            try:
+                code = claimed.read_text(encoding="iso8859-1")
+                outfile = str(pages_tmp / f"{stem}-%d.{self.format}")
+                record.update(self.warm.run_job(code, outfile))
+            except Exception as exc:
+                # Who knows what state the engine is in? Replace it.
+                record.update(status="crash", error=repr(exc))
+                self.warm = WarmEngine.make(**self.engine_kwargs)
+        record["seconds"] = round(time.perf_counter() - start, 6)
+        record["pages"] = self.pages(pages_tmp, stem)
+
+        # Write the record where it will be, then move the job: if the job
+        # was reclaimed by another worker, the move fails and the record and
+        # pages are dropped.
+        record_tmp = self.done / f"{job_name}.json@{self.worker_id}"
+        record_tmp.write_text(json.dumps(record, indent=4) + "\n")
+        try:
+            claimed.rename(self.done / job_name)
+        except FileNotFoundError:
+            record_tmp.unlink()
+            shutil.rmtree(pages_tmp)
+            record["status"] = "reclaimed"
+        else:
+            # Pages from an earlier run of a job with this name are replaced.
+            for name in self.pages(self.outdir, stem):
+                (self.outdir / name).unlink(missing_ok=True)
+            for name in record["pages"]:
+                (pages_tmp / name).replace(self.outdir / name)
+            pages_tmp.rmdir()
+            record_tmp.replace(self.done / f"{job_name}.json")
+        return record
+
+    def pages(self, directory: pathlib.Path, stem: str) -> list[str]:
+        """The names of the pages in `directory` for the job named `stem`, in order."""
+        numbered = []
+        for path in directory.glob(f"{stem}-*.{self.format}"):
+            num = path.name[len(stem) + 1:-len(self.format) - 1]
+            if num.isdigit():
+                numbered.append((int(num), path.name))
+        return [name for _, name in sorted(numbered)]
+
+    def run_one(self) -> dict[str, Any] | None:
+        """Claim and render one job.  Returns its record, or None if there was none."""
+        claimed = self.claim()
+        if claimed is None:
+            return None
+        return self.render(claimed)
+
+    def run(self, poll: float=1.0, once: bool=False) -> int:
+        """
+        Render jobs until stopped, checking for new ones every `poll` seconds.
+
+        With `once`, stop when no jobs are waiting.  Returns the number of jobs
+        rendered.
+        """
+        n_jobs = 0
+        while True:
+            if self.run_one() is not None:
+                n_jobs += 1
+            elif once:
+                return n_jobs
+            else:
+                time.sleep(poll)
+
+
+def _run_worker(kwargs: dict[str, Any], poll: float, once: bool) -> int:
+    return SpoolWorker(**kwargs).run(poll=poll, once=once)
+
+
+def run_workers(
+    n_workers: int,
+    poll: float=1.0,
+    once: bool=False,
+    **worker_kwargs,
+) -> list[int]:
+    """
+    Run `n_workers` SpoolWorkers in their own processes.
+
+    `worker_kwargs` are sent to the processes, so extensions have to be given
+    as "module:name" strings.  Returns the number of jobs each worker rendered.
+    """
+    args = [(worker_kwargs, poll, once)] * n_workers
+    with multiprocessing.Pool(n_workers) as pool:
+        return pool.starmap(_run_worker, args)
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        description="Render PostScript jobs from a spool directory.",
+    )
+    parser.add_argument("spool", help="The spool directory")
+    parser.add_argument(
+        "-o", dest="outdir",
+        help="Where to write pages (default: SPOOL/out)",
+    )
+    parser.add_argument(
+        "-f", dest="format", choices=["svg", "png"], default="svg",
+        help="The format of the pages",
+    )
+    parser.add_argument(
+        "-n", dest="n_workers", type=int, default=1,
+        help="The number of worker processes",
+    )
+    parser.add_argument(
+        "-s", dest="size", metavar="WxH", default="612x792",
+        help="The size of the output, WIDTHxHEIGHT, in points",
+    )
+    parser.add_argument(
+        "--lease", type=float, default=60.0,
+        help="Seconds before a crashed worker's job is taken back",
+    )
+    parser.add_argument(
+        "--poll", type=float, default=1.0,
+        help="Seconds between looks for new jobs",
+    )
+    parser.add_argument(
+        "--once", action="store_true",
+        help="Stop when there are no more jobs",
+    )
+    parser.add_argument(
+        "--prologue", metavar="FILE",
+        help="Code to run in each engine before any jobs",
+    )
+    parser.add_argument(
+        "--ext", metavar="MODULE:NAME", action="append", default=[],
+        help="Load an extension, as well as installed ones (repeatable)",
+    )
+    args = parser.parse_args(argv)
+
+    width, height = map(int, args.size.split("x"))
+    prologue = None
+    if args.prologue is not None:
+        prologue = pathlib.Path(args.prologue).read_text()
+    counts = run_workers(
+        args.n_workers,
+        poll=args.poll,
+        once=args.once,
+        spool=args.spool,
+        outdir=args.outdir,
+        format=args.format,
+        lease=args.lease,
+        size=(width, height),
+        prologue=prologue,
+        extensions=[*extension_specs(), *args.ext],
+    )
+    print(f"{sum(counts)} jobs rendered")
+    return 0
+
+if __name__ == "__main__":          # pragma: no cover
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,85 @@
+"""Tests of checkpoint.py for Stilted."""
+
+import pickle
+
+import pytest
+
+from checkpoint import load_checkpoint
+from cli import main
+from evaluate import Engine
+from extension import Extension
+from test_helpers import compare_stacks
+
+
+EXT = Extension("ext")
+
+@EXT.py_operator
+def triple(x):
+    return x * 3
+
+@EXT.operator("add")
+def add_(engine):
+    engine.push_py(engine.pop_py() - engine.pop_py())
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "1 2 add showpage 10 mul",
+        "/a 10 def 1 1 5 { a add showpage } for",
+        "[ 1 2 showpage 3 ] aload pop 4 3 { add } repeat",
+        "/d 5 dict def d /x 1 put save showpage d /x 2 put d /x get exch restore d /x get",
+        "{ 1 2 showpage add } stopped",
+        "{ 1 2 add (a) showpage add } stopped { $error /errorname get } if",
+        "/add load cvlit showpage cvx 3 4 3 -1 roll exec",
+        "gsave 10 20 translate 1 2 moveto showpage grestore 3 4 transform",
+        "null mark 1.5 (hello) /name showpage 5 array",
+    ],
+)
+def test_resume(text, tmp_path):
+    checkpoint_file = str(tmp_path / "checkpoint")
+
+    # Run all the way through, making checkpoints.
+    engine = Engine(outfile=str(tmp_path / "page.svg"), checkpoint_file=checkpoint_file)
+    engine.push_string(text)
+    engine.exec_text("cvx exec")
+
+    # Resume a fresh engine from the last checkpoint. It should end up the same.
+    resumed = load_checkpoint(checkpoint_file)
+    resumed.run()
+    compare_stacks(resumed.ostack, engine.ostack)
+
+
+def test_resume_extension(tmp_path):
+    checkpoint_file = str(tmp_path / "checkpoint")
+    # The extension's add is not the built-in add.
+    text = "ext begin 5 triple /add load cvlit showpage cvx 2 exch exec end"
+    engine = Engine(outfile=str(tmp_path / "page.svg"), checkpoint_file=checkpoint_file, extensions=[EXT])
+    engine.push_string(text)
+    engine.exec_text("cvx exec")
+    compare_stacks(engine.ostack, [-13])
+
+    resumed = load_checkpoint(checkpoint_file)
+    assert resumed.extensions == [EXT]
+    resumed.run()
+    compare_stacks(resumed.ostack, [-13])
+
+
+def test_checkpoint_local_extension(tmp_path):
+    ext = Extension("local")
+    ext.operator(lambda engine: None)
+    engine = Engine(outfile=str(tmp_path / "page.svg"), checkpoint_file=str(tmp_path / "checkpoint"), extensions=[ext])
+    with pytest.raises(pickle.PicklingError, match="<Extension 'local'>"):
+        engine.exec_text("showpage")
+
+
+def test_cli_resume(tmp_path, capsys):
+    checkpoint_file = str(tmp_path / "checkpoint")
+    outfile = str(tmp_path / "page%d.svg")
+    code = "1 1 3 { dup == showpage } for (done) =="
+    main(["-o", outfile, "--checkpoint", checkpoint_file, "-c", code])
+    assert capsys.readouterr().out == "1\n2\n3\n(done)\n"
+    assert (tmp_path / "page3.svg").exists()
+
+    main(["--resume", checkpoint_file])
+    assert capsys.readouterr().out == "(done)\n"
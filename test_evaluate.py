@@ -1,10 +1,19 @@
 """Test stilted evaluation."""
 
+import array
+import asyncio
+import concurrent.futures
+import importlib
+import subprocess
+import sys
+import time
+
 import pytest
 
-from error import StiltedError
-from evaluate import evaluate
-from dtypes import Name
+from error import StiltedError, StiltedQuit, Tilted
+from evaluate import evaluate, run_round_robin, Engine, LazyOperator, LAZY_OPERATORS, SYSTEMDICT
+from dtypes import Integer, Name, Operator
+from extension import Extension
 from test_helpers import compare_stacks
 
 
@@ -33,6 +42,19 @@ from test_helpers import compare_stacks
             "errordict /typecheck { (!!!) } put (a) 1 10 { hello } for",
             "(a) 1 10 { hello } /for load (!!!)",
         ),
+        (
+            "errordict /typecheck { (!!!) } put 1 (a) /add load exec",
+            "1 (a) /add load (!!!)",
+        ),
+        (
+            "errordict /stackunderflow { (!!!) } put (a) (b) 3 copy",
+            "(a) (b) 3 /copy load (!!!)",
+        ),
+        # Only the operator with the error has its operands put back.
+        (
+            "errordict /syntaxerror { (!!!) } put 1 2 add )",
+            "3 /add cvx (!!!)",
+        ),
     ],
 )
 def test_evaluate(text, stack):
@@ -52,3 +74,363 @@ def test_evaluate(text, stack):
 def test_evaluate_error(text, error):
     with pytest.raises(StiltedError, match=error):
         evaluate(text)
+
+
+@pytest.mark.parametrize(
+    "text, stack",
+    [
+        ("/s (1 2 add) cvx def s s", [3, 3]),
+        # Strings and procedures are new each time.
+        ("/s (<616263> {1}) cvx def s pop dup 0 65 put s pop", ["Abc", "abc"]),
+        ("/s ({1 2}) cvx def s dup 0 99 put s", "{99 2} {1 2}"),
+        # Attributes changed on one execution don't affect the next.
+        ("/s (5) cvx def s cvx s xcheck", "5 cvx false"),
+        # Syntax errors still happen where they occur.
+        ("/s (1 2 }) cvx def { s } stopped pop count", [1, 2, 2]),
+    ],
+)
+def test_text_cache(text, stack):
+    compare_stacks(evaluate(text).ostack, stack)
+
+
+def test_text_cache_size():
+    engine = Engine(text_cache_size=2)
+    engine.exec_text("(1) cvx exec (2) cvx exec (1) cvx exec (3) cvx exec")
+    assert len(engine.text_cache) == 2
+    engine = Engine(text_cache_size=0)
+    engine.exec_text("(1) cvx exec (2) cvx exec (1) cvx exec")
+    assert len(engine.text_cache) == 0
+    compare_stacks(engine.ostack, [1, 2, 1])
+
+
+def test_tilted_info():
+    tilt = Tilted("rangecheck", "need {} <= {}", 10, 5)
+    assert tilt.errname == "rangecheck"
+    assert tilt.info == "need 10 <= 5"
+    assert Tilted("typecheck").info is None
+    assert Tilted("undefined", "{xyzzy}").info == "{xyzzy}"
+
+
+@pytest.mark.parametrize(
+    "val, text",
+    [
+        (17, "17"),
+        (1.5, "1.5"),
+        (True, "true"),
+        (None, "null"),
+        ("hello", "(hello)"),
+        (b"hello", "(hello)"),
+        ([1, (2, 3), "a"], "[1 [2 3] (a)]"),
+        ({"a": 1, "b": [True]}, "2 dict dup /a 1 put dup /b [true] put"),
+        (array.array("d", [1.5, 2.0]), "[1.5 2.0] .tovector"),
+        (array.array("i", [1, 2]), "[1 2] .tovector"),
+        (memoryview(b"abc"), "(abc)"),
+    ],
+)
+def test_push_py(val, text):
+    engine = Engine()
+    engine.push_py(val)
+    expected = evaluate(text).ostack
+    compare_stacks(engine.ostack, expected)
+    assert type(engine.ostack[0]) is type(expected[0])
+
+
+@pytest.mark.parametrize(
+    "text, val",
+    [
+        ("17", 17),
+        ("1.5", 1.5),
+        ("false", False),
+        ("null", None),
+        ("(hello)", b"hello"),
+        ("/hello", "hello"),
+        ("[1 [2 3] (a)]", [1, [2, 3], b"a"]),
+        ("2 dict dup /a 1 put dup /b [true] put", {"a": 1, "b": [True]}),
+        ("[1.5 2.0] .tovector", array.array("d", [1.5, 2.0])),
+        ("[1 2 3 4] 1 2 getinterval", [2, 3]),
+    ],
+)
+def test_pop_py(text, val):
+    engine = Engine()
+    engine.exec_text(text)
+    assert engine.pop_py() == val
+    assert engine.ostack == []
+
+
+def test_py_round_trip():
+    data = {"name": "x", "points": [[1, 2], [3.5, 4.5]], "tags": [], "on": True}
+    engine = Engine()
+    engine.push_py(data)
+    engine.exec_text("dup /tags get length")
+    assert engine.pop_py() == 0
+    assert engine.pop_py() == {**data, "name": b"x"}
+
+
+def test_push_py_shares_bytearray():
+    data = bytearray(b"hello")
+    engine = Engine()
+    engine.push_py(data)
+    engine.exec_text("0 72 put")
+    assert data == b"Hello"
+
+
+def test_pop_py_recursive():
+    engine = Engine()
+    engine.exec_text("/a 2 array def a 0 a put a")
+    result = engine.pop_py()
+    assert result[0] is result
+    assert result[1] is None
+
+
+def test_push_py_errors():
+    engine = Engine()
+    with pytest.raises(TypeError, match="Dict keys must be strings"):
+        engine.push_py({1: 2})
+    with pytest.raises(TypeError, match="Can't make a Stilted object"):
+        engine.push_py(object())
+    assert engine.ostack == []
+
+
+@pytest.mark.parametrize(
+    "name, args, results",
+    [
+        ("add", [1, 2], [3]),
+        ("exch", [1, "a"], [b"a", 1]),
+        ("aload", [[1, 2.5]], [1, 2.5, [1, 2.5]]),
+        ("pop", [1], []),
+        ("product", [], [b"Stilted"]),
+        ("double", [21], [42]),
+    ],
+)
+def test_call(name, args, results):
+    engine = Engine()
+    engine.exec_text("/double { 2 mul } def 99")
+    assert engine.call(name, *args) == results
+    compare_stacks(engine.ostack, [99])
+
+
+def test_call_proc():
+    engine = Engine()
+    engine.exec_text("{ dup mul exch dup mul add }")
+    proc = engine.opop()
+    assert engine.call_proc(proc, 3, 4) == [25]
+    assert engine.call_proc(proc, 5, 12) == [169]
+    assert engine.ostack == []
+
+
+def test_call_proc_from_operator():
+    ext = Extension("x")
+
+    @ext.operator
+    def apply(engine):
+        proc = engine.opop()
+        try:
+            engine.opush(engine.new_object(engine.call_proc(proc, 10)))
+        except StiltedError as err:
+            engine.push_py(str(err).encode())
+
+    engine = Engine(extensions=[ext])
+    engine.exec_text("x begin {1 add} apply 100 200 {0 get} apply (end) end")
+    assert [engine.to_py(obj) for obj in engine.ostack] == [[11], 100, 200, b"typecheck", b"end"]
+    assert engine.estack == []
+
+
+def test_call_proc_then_fail():
+    ext = Extension("x")
+
+    @ext.operator
+    def apply_then_fail(engine):
+        n = engine.opop(Integer)
+        proc = engine.opop()
+        engine.call_proc(proc, n.value)
+        raise Tilted("rangecheck")
+
+    engine = Engine(extensions=[ext])
+    engine.exec_text("x begin { {5 add} 7 apply_then_fail } stopped end")
+    assert [engine.to_py(obj) for obj in engine.ostack] == [[5, "add"], 7, True]
+
+
+@pytest.mark.parametrize(
+    "name, args, error",
+    [
+        ("add", [1, "a"], "typecheck"),
+        ("get", [[1, 2], 5], "rangecheck"),
+        ("nosuchname", [], "undefined"),
+        ("stop", [], "stop"),
+    ],
+)
+def test_call_error(name, args, error):
+    engine = Engine()
+    engine.exec_text("99 [")
+    with pytest.raises(StiltedError, match=error):
+        engine.call(name, *args)
+    assert len(engine.ostack) == 2
+    assert engine.marks == [1]
+    assert not engine.to_py(engine.builtin_dict("$error")).get("newerror")
+    assert engine.call("add", 1, 2) == [3]
+
+
+def test_engines_are_isolated():
+    engine1 = Engine()
+    engine1.exec_text("systemdict /foo 1 put true cvx pop /add load cvlit pop")
+    engine2 = Engine()
+    engine2.exec_text("systemdict /foo known true xcheck /add load xcheck")
+    compare_stacks(engine2.ostack, [False, False, True])
+
+
+STRESS = """
+    systemdict /n {n} put
+    /total 0 def
+    /sq {{ dup mul }} bind def
+    1 1 200 {{ sq n mul total add /total exch def }} for
+    /true load cvx pop
+    total true n
+"""
+
+def run_stress(n):
+    engine = Engine()
+    engine.exec_text(STRESS.format(n=n))
+    return engine.ostack
+
+
+def test_engines_on_threads():
+    # Each engine changes its own systemdict while the others are running.
+    n_threads = 8
+    with concurrent.futures.ThreadPoolExecutor(n_threads) as executor:
+        results = list(executor.map(run_stress, range(n_threads * 4)))
+    sum_sq = 200 * 201 * 401 // 6
+    for n, stack in enumerate(results):
+        compare_stacks(stack, [sum_sq * n, True, n])
+
+
+def logging_engines(log, n):
+    # Engines that each log their id five times.
+    ext = Extension("log")
+
+    @ext.py_operator("note")
+    def note_(i):
+        log.append(i)
+
+    engines = []
+    for i in range(n):
+        engine = Engine(outfile=None, extensions=[ext])
+        engine.add_text(f"log begin 1 1 5 {{ pop {i} note }} for end {i}")
+        engines.append(engine)
+    return engines
+
+
+def test_run_slice():
+    engine = Engine()
+    engine.add_text("0 1 1 100 { add } for")
+    slices = 1
+    while engine.run_slice(10):
+        slices += 1
+    assert slices > 10
+    compare_stacks(engine.ostack, [5050])
+    assert not engine.run_slice(10)
+
+
+def test_run_round_robin():
+    log: list[int] = []
+    engines = logging_engines(log, 3)
+    run_round_robin(engines, budget=3)
+    # Each engine got turns before the others finished.
+    assert sorted(log) == [0] * 5 + [1] * 5 + [2] * 5
+    assert log.index(2) < 5
+    for i, engine in enumerate(engines):
+        compare_stacks(engine.ostack, [i])
+
+
+def test_run_round_robin_errors():
+    log: list[int] = []
+    engines = logging_engines(log, 2)
+    quitter = Engine()
+    quitter.add_text("1 2 quit")
+    raiser = Engine()
+    raiser.add_text("/rangecheck .pyraise")
+    engines[1:1] = [quitter, raiser]
+    stopped_by = run_round_robin(engines, budget=3)
+    assert stopped_by[0] is None
+    assert isinstance(stopped_by[1], StiltedQuit)
+    assert isinstance(stopped_by[2], StiltedError)
+    assert stopped_by[3] is None
+    # The others ran to the end.
+    assert sorted(log) == [0] * 5 + [1] * 5
+    compare_stacks(engines[0].ostack, [0])
+    compare_stacks(engines[3].ostack, [1])
+
+
+def test_run_async():
+    log: list[int] = []
+    engines = logging_engines(log, 3)
+
+    async def main():
+        await asyncio.gather(*(engine.run_async(budget=3) for engine in engines))
+
+    asyncio.run(main())
+    assert sorted(log) == [0] * 5 + [1] * 5 + [2] * 5
+    assert log.index(2) < 5
+    for i, engine in enumerate(engines):
+        compare_stacks(engine.ostack, [i])
+
+
+def test_run_async_page_executor():
+    class RecordingExecutor(concurrent.futures.ThreadPoolExecutor):
+        submitted: list = []
+
+        def submit(self, fn, /, *args, **kwargs):
+            self.submitted.append(fn)
+            return super().submit(fn, *args, **kwargs)
+
+    engine = Engine(outfile=None)
+    engine.add_text("0 0 moveto 10 10 lineto stroke showpage showpage 17")
+    with RecordingExecutor(1) as executor:
+        asyncio.run(engine.run_async(page_executor=executor))
+    assert len(executor.submitted) == 2
+    assert engine.page_executor is None
+    assert engine.pending_pages == []
+    compare_stacks(engine.ostack, [17])
+
+
+def test_run_async_error_waits_for_pages():
+    class SlowExecutor(concurrent.futures.ThreadPoolExecutor):
+        futures: list = []
+
+        def submit(self, fn, /, *args, **kwargs):
+            def slow_fn():
+                time.sleep(0.05)
+                fn()
+            future = super().submit(slow_fn)
+            self.futures.append(future)
+            return future
+
+    engine = Engine(outfile=None)
+    engine.add_text("showpage showpage /rangecheck .pyraise")
+    with SlowExecutor(1) as executor:
+        with pytest.raises(StiltedError, match="rangecheck"):
+            asyncio.run(engine.run_async(page_executor=executor))
+        assert len(executor.futures) == 2
+        assert all(future.done() for future in executor.futures)
+    assert engine.page_executor is None
+    assert engine.pending_pages == []
+
+
+def test_graphics_not_imported():
+    # Jobs that don't draw don't need PyCairo at all.
+    code = (
+        "import sys, evaluate; "
+        + "evaluate.Engine().exec_text('save 1 2 add exch restore'); "
+        + "print(sorted(set(sys.modules) & {'cairo', 'device', *evaluate.LAZY_OPERATORS}))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+    )
+    assert result.stdout == "[]\n"
+
+
+def test_lazy_operators():
+    for modname in LAZY_OPERATORS:
+        importlib.import_module(modname)
+    for name, op in SYSTEMDICT.items():
+        if isinstance(op, Operator):
+            assert not isinstance(op.value, LazyOperator), f"{name} wasn't defined"
@@ -0,0 +1,150 @@
+"""Tests of extensions for stilted."""
+
+import importlib.metadata
+
+import pytest
+
+import extension as extension_module
+from cli import main
+from error import StiltedError
+from evaluate import evaluate, Engine
+from dtypes import Name
+from extension import Extension
+from test_helpers import compare_stacks
+
+
+extension = Extension("testext")
+
+@extension.operator
+def swap(engine: Engine) -> None:
+    a, b = engine.opopn(2)
+    engine.opush(b, a)
+
+@extension.py_operator(".join")
+def join_(sep: bytes, items: list) -> bytes:
+    return sep.join(items)
+
+@extension.py_operator
+def cumsum(nums: list) -> list:
+    total = 0
+    sums = []
+    for num in nums:
+        total += num
+        sums.append(total)
+    return sums
+
+@extension.py_operator
+def nothing(x):
+    return None
+
+@extension.py_operator
+def pick(items: list, i: int):
+    return items[i]
+
+@extension.py_operator
+def ratio(a, b):
+    return a / b
+
+
+def run(text: str) -> Engine:
+    engine = Engine(extensions=[extension])
+    engine.push_string(text)
+    engine.exec_text("cvx stopped { $error /errorname get .pyraise } if")
+    return engine
+
+
+@pytest.mark.parametrize(
+    "text, stack",
+    [
+        ("1 2 testext /swap get exec", [2, 1]),
+        ("testext begin 1 2 swap end", [2, 1]),
+        ("testext begin (, ) [(a) (b) (c)] .join end", ["a, b, c"]),
+        ("testext begin [1 2 3.5] cumsum aload pop end", [1, 3, 6.5]),
+        ("testext begin 17 nothing end", []),
+        ("testext begin [(a) (b)] 1 pick end", ["b"]),
+        ("testext /swap get type", [Name(False, "operatortype")]),
+        ("testext /swap get ==", []),
+    ],
+)
+def test_evaluate(text, stack):
+    compare_stacks(run(text).ostack, stack)
+
+
+@pytest.mark.parametrize(
+    "text, error",
+    [
+        ("testext begin 1 swap", "stackunderflow"),
+        ("testext begin (a) [1 2] .join", "typecheck"),
+        ("testext begin [1 2] 5 pick", "rangecheck"),
+        ("testext begin 1 0 ratio", "undefinedresult"),
+        ("testext begin [(a) 1] cumsum", "typecheck"),
+    ],
+)
+def test_evaluate_error(text, error):
+    with pytest.raises(StiltedError, match=error):
+        run(text)
+
+
+@pytest.mark.parametrize(
+    "func",
+    [
+        lambda a, b=1: a,
+        lambda *args: args,
+        lambda a, **kwargs: a,
+        lambda a, *, b: a,
+    ],
+)
+def test_py_operator_signatures(func):
+    ext = Extension("bad")
+    with pytest.raises(TypeError, match="positional parameters"):
+        ext.py_operator(func)
+
+
+def test_py_operator_bad_result():
+    # A result that can't be a Stilted object is the extension's bug, not a
+    # Stilted typecheck error.
+    ext = Extension("x")
+
+    @ext.py_operator
+    def makeset():
+        return {1, 2}
+
+    engine = Engine(extensions=[ext])
+    with pytest.raises(TypeError, match="Can.t make a Stilted object"):
+        engine.exec_text("x begin makeset end")
+
+
+def test_not_in_other_engines():
+    Engine(extensions=[extension])
+    with pytest.raises(StiltedError, match="undefined"):
+        evaluate("testext")
+
+
+def test_add_extension():
+    engine = Engine()
+    engine.add_extension("test_extension", name="tx")
+    engine.add_extension("test_extension:extension")
+    engine.exec_text("1 2 tx /swap get exec testext begin swap end")
+    compare_stacks(engine.ostack, [1, 2])
+    with pytest.raises(ValueError, match="already defined"):
+        engine.add_extension(extension)
+    with pytest.raises(TypeError, match="isn't an Extension"):
+        engine.add_extension("test_extension:run")
+
+
+def test_find_extensions(monkeypatch):
+    entry_points = importlib.metadata.EntryPoints([
+        importlib.metadata.EntryPoint(
+            name="testext", value="test_extension:extension", group="stilted.extensions",
+        ),
+    ])
+    def fake_entry_points(group):
+        assert group == "stilted.extensions"
+        return entry_points
+    monkeypatch.setattr(importlib.metadata, "entry_points", fake_entry_points)
+    assert extension_module.find_extensions() == [extension]
+
+
+def test_cli(capsys):
+    main(["--ext", "test_extension", "-c", "1 2 testext begin swap end pstack"])
+    assert capsys.readouterr().out == "1\n2\n"
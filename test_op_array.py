@@ -4,7 +4,7 @@ import pytest
 
 from error import StiltedError
 from evaluate import evaluate
-from dtypes import Name
+from dtypes import Array, Name
 from test_helpers import compare_stacks
 
 
@@ -44,12 +44,44 @@ from test_helpers import compare_stacks
         ("10 array dup dup 3 (a) put save exch 3 (b) put restore 3 get", ["a"]),
         # putinterval
         ("[9 8 7 6 5] dup 1 [1 2 3] putinterval {} forall", [9, 1, 2, 3, 5]),
+        ("[1 2 3 4 5] dup dup 1 exch 0 3 getinterval putinterval aload pop", [1, 1, 2, 3, 5]),
+        ("[1 2 3] dup save exch 0 [7 8] putinterval restore aload pop", [1, 2, 3]),
+        # astore and copy restore their changes
+        ("3 array dup 1 2 3 4 -1 roll astore pop dup save exch 7 8 9 4 -1 roll astore pop restore aload pop", [1, 2, 3]),
+        ("[1 2 3] dup save [7 8] 3 -1 roll copy pop restore aload pop", [1, 2, 3]),
+        # Arrays of numbers are stored compactly, until something else is put.
+        ("[1 2 3] dup 0 (a) put aload pop", ["a", 2, 3]),
+        ("[1 2 3] dup 1 2.5 put aload pop", [1, 2.5, 3]),
+        ("[1.5 2.5] dup 0 1 put aload pop", [1, 2.5]),
+        ("[1 2 3] dup 1 [(a) (b)] putinterval aload pop", [1, "a", "b"]),
+        ("[1 2 3] dup 0 1 cvx put 0 get xcheck", [True]),
+        ("[1 2 3] dup save exch 0 (a) put restore 0 get", [1]),
+        ("[1 2 3] cvx exec", [1, 2, 3]),
     ],
 )
 def test_evaluate(text, stack):
     compare_stacks(evaluate(text).ostack, stack)
 
 
+@pytest.mark.parametrize(
+    "text, typecode",
+    [
+        ("[1 2 3]", "q"),
+        ("[1.5 2.5]", "d"),
+        ("matrix", "d"),
+        ("[1 2.5]", None),
+        ("[1 (a)]", None),
+        ("[1 2 3 cvx]", None),
+        ("[4294967296]", None),
+        ("[]", None),
+    ],
+)
+def test_compact_storage(text, typecode):
+    arr = evaluate(text).ostack[0]
+    assert isinstance(arr, Array)
+    assert arr.typecode == typecode
+
+
 @pytest.mark.parametrize(
     "text, error",
     [
@@ -3,13 +3,17 @@
 import pytest
 
 from dtypes import Name
-from error import StiltedError
+from error import StiltedError, StiltedQuit
 from evaluate import evaluate
 from test_helpers import compare_stacks
 
 @pytest.mark.parametrize(
     "text, stack",
     [
+        # countexecstack
+        ("countexecstack countexecstack eq", [True]),
+        ("{ countexecstack } exec countexecstack sub", [0]),
+        ("{ countexecstack 1 pop } exec countexecstack sub", [1]),
         # exec
         ("12 exec", [12]),
         ("12 cvx exec cvlit", [12]),
@@ -17,6 +21,8 @@ from test_helpers import compare_stacks
         ("/xyzzy exec", [Name(True, "xyzzy")]),
         ("/xyzzy {1 2 add} def /xyzzy cvx exec", [3]),
         ("{1 2 add} exec", [3]),
+        ("5 6 {1 2 add 3 mul} 2 2 getinterval cvx exec", [11, 3]),
+        ("{} exec 99", [99]),
         ("(1 2 add) cvx exec", [3]),
         ("/add load cvlit exec cvx", "/add load"),
         ("97 null cvx exec /null load cvlit pop", [97]),
@@ -121,5 +127,14 @@ def test_evaluate_error(text, error):
     ],
 )
 def test_system_exit(code):
-    with pytest.raises(SystemExit):
+    with pytest.raises(StiltedQuit):
         evaluate(code)
+
+def test_tail_calls():
+    # A tail-recursive procedure runs in constant execution stack space.
+    text = """
+        /down { dup 0 gt { 1 sub down } { pop countexecstack } ifelse } def
+        10 down 10000 down
+        """
+    depth10, depth10000 = evaluate(text).ostack
+    assert depth10 == depth10000
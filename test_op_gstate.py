@@ -3,7 +3,7 @@
 import pytest
 
 from error import StiltedError
-from evaluate import evaluate
+from evaluate import evaluate, Engine
 from test_helpers import compare_stacks
 
 
@@ -72,6 +72,10 @@ from test_helpers import compare_stacks
         ("1 2 moveto gsave 3 4 moveto save 5 6 moveto gsave 7 8 moveto gsave restore currentpoint", [3.0, 4.0]),
         ("2.5 setlinewidth gsave 3.5 setlinewidth grestore currentlinewidth", [2.5]),
         ("[1 2 3] 3.5 setdash gsave [4 5] 1 setdash grestore currentdash", "[1 2 3] 3.5"),
+        # The device is made by the first graphics operator, after these gsaves.
+        ("gsave 3.5 setlinewidth grestore currentlinewidth", [1.0]),
+        ("save 3.5 setlinewidth restore currentlinewidth", [1.0]),
+        ("save gsave grestore restore currentlinewidth", [1.0]),
     ],
 )
 def test_evaluate(text, stack):
@@ -125,3 +129,10 @@ def test_evaluate(text, stack):
 def test_evaluate_error(text, error):
     with pytest.raises(StiltedError, match=error):
         evaluate(text)
+
+
+def test_null_device(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = Engine(outfile=None)
+    engine.exec_text("0 0 moveto 100 100 lineto stroke showpage 2 setlinewidth showpage")
+    assert list(tmp_path.iterdir()) == []
@@ -14,10 +14,14 @@ from test_helpers import compare_stacks
         ("3 abs", [3]),
         ("-3 abs", [3]),
         ("-3.5 abs", [3.5]),
+        ("-2147483648 abs", [2147483648.0]),
         # add
         ("3 4 add", [7]),
         ("3 4.5 add", [7.5]),
         ("3.5 4.5 add", [8.0]),
+        ("2147483647 1 add", [2147483648.0]),
+        ("-2147483648 -1 add", [-2147483649.0]),
+        ("2147483647 0 add", [2147483647]),
         # atan
         ("0 1 atan", [0.0]),
         ("1 0 atan", [90.0]),
@@ -56,9 +60,12 @@ from test_helpers import compare_stacks
         ("3 2 mul", [6]),
         ("1.5 3.5 mul", [5.25]),
         ("2 3.5 mul", [7.0]),
+        ("65536 65536 mul", [4294967296.0]),
+        ("65536 -32768 mul", [-2147483648]),
         # neg
         ("4.5 neg", [-4.5]),
         ("-3 neg", [3]),
+        ("-2147483648 neg", [2147483648.0]),
         # rand, rrand, srand
         ("17 srand rand rand rand rand", [1778837931, 1303193990, 1570340887, 1243931546]),
         ("17 srand rand rand 17 srand rand rand", [1778837931, 1303193990, 1778837931, 1303193990]),
@@ -85,6 +92,8 @@ from test_helpers import compare_stacks
         # sub
         ("3 4 sub", [-1]),
         ("3.5 1.5 sub", [2.0]),
+        ("-2147483648 1 sub", [-2147483649.0]),
+        ("3 0.5 sub", [2.5]),
         # truncate
         ("3.2 truncate", [3.0]),
         ("-4.8 truncate", [-4.0]),
@@ -135,6 +144,10 @@ def test_two_arg_typecheck2(opname):
     [
         # # atan, meh let it be zero.
         # ("0 0 atan", "undefinedresult"),
+        # div
+        ("1 0 div", "undefinedresult"),
+        ("1.5 0.0 div", "undefinedresult"),
+        ("(a) 0 div", "typecheck"),
         # exp
         ("-1 1.5 exp", "undefinedresult"),
         # sqrt
@@ -57,6 +57,29 @@ from test_helpers import compare_stacks
         ("200 600 2 3 matrix scale itransform", [100.0, 200.0]),
         # matrix
         ("matrix aload pop", [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]),
+        # .transformpoints and friends
+        ("[1 2 3 4] 2 3 matrix scale .transformpoints aload pop", [2.0, 6.0, 6.0, 12.0]),
+        ("[1 2 3 4] 10 20 matrix translate .transformpoints aload pop", [11.0, 22.0, 13.0, 24.0]),
+        ("[1 2 3 4] 10 20 matrix translate .dtransformpoints aload pop", [1.0, 2.0, 3.0, 4.0]),
+        ("[11 22 13 24] 10 20 matrix translate .itransformpoints aload pop", [1.0, 2.0, 3.0, 4.0]),
+        ("[2 6] 2 3 matrix scale .idtransformpoints aload pop", [1.0, 2.0]),
+        ("matrix identmatrix setmatrix 90 rotate [100 200] matrix currentmatrix .transformpoints aload pop", [-200.0, 100.0]),
+        ("matrix identmatrix setmatrix 2 3 scale [200 600] matrix currentmatrix .itransformpoints aload pop", [100.0, 200.0]),
+        ("[1 2] .tovector 2 3 matrix scale .transformpoints dup type exch {} forall", "/arraytype cvx 2.0 6.0"),
+        ("[] matrix .transformpoints length", [0]),
+        (
+            "[1 2 3 4 5 6] 30 matrix rotate .transformpoints aload pop",
+            "1 2 30 matrix rotate transform 3 4 30 matrix rotate transform 5 6 30 matrix rotate transform",
+        ),
+        # Cached Cairo matrices are forgotten when the array changes.
+        ("/m matrix def 1 1 m transform m 0 2.0 put 1 1 m transform", [1.0, 1.0, 2.0, 1.0]),
+        ("/m matrix def 2 2 m itransform m 0 2.0 put 2 2 m itransform", [2.0, 2.0, 1.0, 2.0]),
+        ("/m matrix def 1 1 m transform m 4 [5 6] putinterval 1 1 m transform", [1.0, 1.0, 6.0, 7.0]),
+        ("/m matrix def 1 1 m transform 2 0 0 2 0 0 m astore pop 1 1 m transform", [1.0, 1.0, 2.0, 2.0]),
+        ("/m matrix def 1 1 m transform 2 3 matrix scale m copy pop 1 1 m transform", [1.0, 1.0, 2.0, 3.0]),
+        ("/m matrix def 1 1 m transform 2 3 m scale pop 1 1 m transform", [1.0, 1.0, 2.0, 3.0]),
+        ("/m matrix def save m 0 2.0 put 1 1 m transform 3 -1 roll restore 1 1 m transform", [2.0, 1.0, 1.0, 1.0]),
+        ("/m 2 3 matrix scale def m setmatrix matrix currentmatrix setmatrix 1 1 transform", [2.0, 3.0]),
         # rotate
         ("30 matrix rotate aload pop", [sqrt(3)/2, 0.5, -0.5, sqrt(3)/2, 0.0, 0.0]),
         # scale
@@ -91,6 +114,18 @@ def test_evaluate(text, stack):
         # concat
         ("concat", "stackunderflow"),
         ("1 concat", "typecheck"),
+        ("[1 2 3 4 5 (a)] concat", "typecheck"),
+        # .transformpoints
+        (".transformpoints", "stackunderflow"),
+        ("1 .transformpoints", "typecheck"),
+        ("1 matrix .transformpoints", "typecheck"),
+        ("[1 2 3] matrix .transformpoints", "rangecheck"),
+        ("[1 (a)] matrix .transformpoints", "typecheck"),
+        # The matrix is required: a points array isn't taken for one.
+        ("[1 2] .transformpoints", "rangecheck"),
+        ("[1 2 3 4 5 6] .transformpoints", "stackunderflow"),
+        ("[1 2] [1 2 3] .transformpoints", "rangecheck"),
+        ("[1 2] [0 0 0 0 0 0] .itransformpoints", "undefinedresult"),
         ("[1] concat", "rangecheck"),
         # concatmatrix
         ("concatmatrix", "stackunderflow"),
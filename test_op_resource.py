@@ -0,0 +1,71 @@
+"""Tests of resource operators for stilted."""
+
+import pytest
+
+from error import StiltedError
+from evaluate import evaluate, Engine
+from dtypes import Name
+from globalvm import GlobalVM
+from test_helpers import compare_stacks
+
+
+@pytest.mark.parametrize(
+    "text, stack",
+    [
+        # defineresource and findresource
+        ("/P 1 dict /ProcSet defineresource length", [0]),
+        ("/P 1 dict dup /x 7 put /ProcSet defineresource pop /P /ProcSet findresource /x get", [7]),
+        ("(P) 1 dict /ProcSet defineresource pop /P (ProcSet) findresource type", [Name(False, "dicttype")]),
+        ("/P 1 /ProcSet defineresource /P 2 /ProcSet defineresource /P /ProcSet findresource", [1, 2, 2]),
+        # Local resources are found before global ones.
+        ("true setglobal /P 1 /ProcSet defineresource false setglobal /P 2 /ProcSet defineresource"
+            + " pop pop /P /ProcSet findresource", [2]),
+        # Local resources are restored, global ones aren't.
+        ("save /P 1 /ProcSet defineresource pop restore /P /ProcSet resourcestatus", [False]),
+        ("save true setglobal /P 1 /ProcSet defineresource pop restore /P /ProcSet findresource", [1]),
+        # resourcestatus
+        ("/P /ProcSet resourcestatus", [False]),
+        ("/P 1 dict /ProcSet defineresource pop /P /ProcSet resourcestatus", [0, -1, True]),
+        ("true setglobal /P 1 dict /ProcSet defineresource pop /P /ProcSet resourcestatus", [0, -1, True]),
+        # undefineresource
+        ("/P 1 /ProcSet defineresource pop /P /ProcSet undefineresource /P /ProcSet resourcestatus", [False]),
+        ("/P /ProcSet undefineresource", []),
+    ],
+)
+def test_evaluate(text, stack):
+    compare_stacks(evaluate(text).ostack, stack)
+
+
+@pytest.mark.parametrize(
+    "text, error",
+    [
+        ("/P /ProcSet findresource", "undefinedresource"),
+        ("/P 1 dict /ProcSet defineresource pop /Q /ProcSet findresource", "undefinedresource"),
+        ("1 /ProcSet findresource", "typecheck"),
+        ("/P 1 dict true setglobal /ProcSet defineresource", "invalidaccess"),
+        ("/P /ProcSet defineresource", "stackunderflow"),
+    ],
+)
+def test_evaluate_error(text, error):
+    with pytest.raises(StiltedError, match=error):
+        evaluate(text)
+
+
+def test_shared_procset():
+    # A prologue loaded once in global VM is found by other engines.
+    vm = GlobalVM()
+    loader = Engine(global_vm=vm)
+    loader.exec_text("""
+        true setglobal
+        /Prolog 2 dict begin
+            /sq { dup mul } def
+            /label (hello) def
+        currentdict end /ProcSet defineresource pop
+        false setglobal
+        """)
+    for n in range(3):
+        job = Engine(global_vm=vm)
+        job.exec_text(f"/Prolog /ProcSet findresource begin {n} sq label end")
+        compare_stacks(job.ostack, [n * n, "hello"])
+    with pytest.raises(StiltedError, match="undefinedresource"):
+        evaluate("/Prolog /ProcSet findresource")
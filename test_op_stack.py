@@ -24,6 +24,15 @@ from test_helpers import compare_stacks
         # counttomark
         ("mark 1 2 3 counttomark", [MARK, 1, 2, 3, 3]),
         ("mark counttomark", [MARK, 0]),
+        ("1 mark 2 3 mark 4 cleartomark counttomark", [1, MARK, 2, 3, 2]),
+        ("mark 1 2 3 -1 roll counttomark", [1, 2, MARK, 0]),
+        ("mark 1 exch counttomark", [1, MARK, 0]),
+        ("mark 1 2 copy counttomark", [MARK, 1, MARK, 1, 1]),
+        ("mark 1 1 index counttomark", [MARK, 1, MARK, 0]),
+        ("mark 1 2 mark pop counttomark", [MARK, 1, 2, 2]),
+        ("mark 1 [ 2 ] counttomark", "mark 1 [2] 2"),
+        ("mark 1 clear mark counttomark", [MARK, 0]),
+        ("mark { mark (a) 1 put } stopped pop counttomark", [MARK, MARK, "a", 1, 2]),
         # dup
         ("1 123 dup", [1, 123, 123]),
         # exch
@@ -40,6 +49,9 @@ from test_helpers import compare_stacks
         ("(a) (b) (c) 3 -1 roll", ["b", "c", "a"]),
         ("(a) (b) (c) 3 1 roll", ["c", "a", "b"]),
         ("(a) (b) (c) 3 0 roll", ["a", "b", "c"]),
+        ("1 2 3 4 5 5 7 roll", [4, 5, 1, 2, 3]),
+        ("(a) (b) (c) 3 -4 roll", ["b", "c", "a"]),
+        ("(a) (b) (c) 0 5 roll", ["a", "b", "c"]),
     ],
 )
 def test_evaluate(text, stack):
@@ -58,6 +70,8 @@ def test_evaluate(text, stack):
         ("(a) (b) -1 copy", "rangecheck"),
         # counttomark
         ("1 2 3 counttomark", "unmatchedmark"),
+        ("mark 1 pop pop 1 2 3 counttomark", "unmatchedmark"),
+        ("mark 1 2 3 1 1 roll pop 1 4 roll pop pop pop counttomark", "unmatchedmark"),
         # dup
         ("dup", "stackunderflow"),
         # exch
@@ -77,6 +91,7 @@ def test_evaluate(text, stack):
         ("1 2 3 (a) 1 roll", "typecheck"),
         ("1 2 3 1 (a) roll", "typecheck"),
         ("1 2 3 10 1 roll", "stackunderflow"),
+        ("1 2 3 -1 1 roll", "rangecheck"),
     ],
 )
 def test_evaluate_error(text, error):
@@ -37,6 +37,7 @@ from test_helpers import compare_stacks
         ("(0123456789) dup 3 (xyz) putinterval", ["012xyz6789"]),
         ("(0123) dup 0 (wxyz) putinterval", ["wxyz"]),
         ("(0123456789) dup 3 4 getinterval 1 (XYZ) putinterval", ["0123XYZ789"]),
+        ("(0123456789) dup dup 2 exch 0 5 getinterval putinterval", ["0101234789"]),
         # string
         ("5 string", ["\0\0\0\0\0"]),
         ("0 string", [""]),
@@ -19,6 +19,7 @@ from test_helpers import compare_stacks
         ("(123 456) cvi (789 }) cvi", [123, 789]),
         # cvlit
         ("{hello} cvlit xcheck", [False]),
+        ("{hello} dup cvlit xcheck exch xcheck", [False, True]),
         # cvn
         ("(xyzzy) cvn", [Name(True, "xyzzy")]),
         ("(xyzzy) cvx cvn", [Name(False, "xyzzy")]),
@@ -38,6 +39,7 @@ from test_helpers import compare_stacks
         ("[1 2 3] 15 string cvs", ["--nostringval--"]),
         # cvx
         ("/Hello cvx xcheck", [True]),
+        ("null dup cvx xcheck exch xcheck", [True, False]),
         # type
         ("true type", [Name(False, "booleantype")]),
         ("123 type", [Name(False, "integertype")]),
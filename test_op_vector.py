@@ -0,0 +1,77 @@
+"""Tests of vector operators for stilted."""
+
+import pytest
+
+from error import StiltedError
+from evaluate import evaluate
+from dtypes import Name
+from test_helpers import compare_stacks
+
+
+@pytest.mark.parametrize(
+    "text, stack",
+    [
+        # .tovector and .toarray
+        ("[1 2 3] .tovector {} forall", [1, 2, 3]),
+        ("[1 2.5] .tovector {} forall", [1.0, 2.5]),
+        ("[] .tovector length", [0]),
+        ("[1 2 3] .tovector .toarray aload pop", [1, 2, 3]),
+        ("[1 2 3] .tovector .toarray 0 (a) put", []),
+        ("[1 2 3] .tovector type", [Name(False, "arraytype")]),
+        # Array operators on vectors
+        ("[1 2 3] .tovector dup length exch 2 get", [3, 3]),
+        ("[1 2 3] .tovector dup 1 99 put aload pop", [1, 99, 3]),
+        ("[1.5 2] .tovector dup 1 99 put aload pop", [1.5, 99.0]),
+        ("[1 2 3 4] .tovector 1 2 getinterval {} forall", [2, 3]),
+        ("[1 2 3 4] .tovector dup 1 [8 9] putinterval {} forall", [1, 8, 9, 4]),
+        ("[1 2 3] .tovector [0 0 0 0] copy {} forall", [1, 2, 3]),
+        ("[1 2 3] .tovector dup 7 8 9 4 -1 roll astore pop {} forall", [7, 8, 9]),
+        ("[1 2 3] .tovector ==", []),
+        ("[1 2 3] .tovector dup save exch 0 5 put restore 0 get", [1]),
+        ("[1 2 3] .tovector cvx exec", [1, 2, 3]),
+        # Elementwise arithmetic
+        ("[1 2 3] .tovector [10 20 30] .tovector .vadd {} forall", [11, 22, 33]),
+        ("[1 2 3] .tovector 0.5 .vadd {} forall", [1.5, 2.5, 3.5]),
+        ("10 [1 2 3] .tovector .vsub {} forall", [9, 8, 7]),
+        ("[1 2 3] .tovector 2 .vmul {} forall", [2, 4, 6]),
+        ("[65536 2] .tovector 65536 .vmul {} forall", [4294967296.0, 131072.0]),
+        ("[1 2 3] .tovector 2 .vdiv {} forall", [0.5, 1.0, 1.5]),
+        # Reductions
+        ("[1 2 3] .tovector .vsum", [6]),
+        ("[1 2.5] .tovector .vsum", [3.5]),
+        ("[] .tovector .vsum", [0]),
+        ("[3 1 2] .tovector dup .vmin exch .vmax", [1, 3]),
+    ],
+)
+def test_evaluate(text, stack):
+    compare_stacks(evaluate(text).ostack, stack)
+
+
+def test_output(capsys):
+    evaluate("[1 2 3] .tovector == [1.5 -2] .tovector ==")
+    assert capsys.readouterr().out == "[1 2 3]\n[1.5 -2.0]\n"
+
+
+@pytest.mark.parametrize(
+    "text, error",
+    [
+        ("[1 (a)] .tovector", "typecheck"),
+        ("[1 2] .toarray", "typecheck"),
+        ("[1 2] .tovector 0 (a) put", "typecheck"),
+        ("[1 2] .tovector 0 1.5 put", "typecheck"),
+        ("[1 2] .tovector 0 4294967296 put", "rangecheck"),
+        ("[1 (a)] [1 2] .tovector copy", "typecheck"),
+        ("1 2 .vadd", "typecheck"),
+        ("[1 2] .tovector (a) .vadd", "typecheck"),
+        ("[1 2] .tovector [1 2 3] .tovector .vadd", "rangecheck"),
+        ("[1 2] .tovector 0 .vdiv", "undefinedresult"),
+        ("[1 2] .tovector [1 0] .tovector .vdiv", "undefinedresult"),
+        ("(abc) 0 .vdiv", "typecheck"),
+        ("(abc) [1 0] .tovector .vdiv", "typecheck"),
+        ("[] .tovector .vmax", "rangecheck"),
+        (".vsum", "stackunderflow"),
+    ],
+)
+def test_evaluate_error(text, error):
+    with pytest.raises(StiltedError, match=error):
+        evaluate(text)
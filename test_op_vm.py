@@ -3,7 +3,8 @@
 import pytest
 
 from error import StiltedError
-from evaluate import evaluate
+from evaluate import evaluate, Engine
+from dtypes import Name
 from test_helpers import compare_stacks
 
 
@@ -12,6 +13,24 @@ from test_helpers import compare_stacks
     [
         ("/foo 17 def save /foo 23 def foo exch restore foo", [23, 17]),
         ("/d 10 dict def d /foo 17 put save d /foo 23 put d begin foo exch restore foo", [23, 17]),
+        # restore brings back the graphics state from its save.
+        ("2 setlinewidth save 3 setlinewidth gsave 4 setlinewidth restore currentlinewidth", [2.0]),
+        ("2 setlinewidth save 3 setlinewidth save pop 4 setlinewidth restore currentlinewidth", [2.0]),
+        # currentglobal, setglobal and gcheck
+        ("currentglobal true setglobal currentglobal", [False, True]),
+        ("1 gcheck (a) gcheck /a gcheck", [True, True, True]),
+        ("[1] gcheck 1 dict gcheck", [False, False]),
+        ("true setglobal [1] gcheck 1 dict gcheck {1} gcheck", [True, True, True]),
+        ("true setglobal [[1] {2}] 0 get gcheck", [True]),
+        ("globaldict gcheck userdict gcheck", [True, False]),
+        # Global VM isn't affected by restore.
+        ("true setglobal /a [1 2] def save a 0 99 put restore a 0 get", [99]),
+        ("save globaldict /x 5 put restore globaldict /x get", [5]),
+        ("save true setglobal globaldict /g 3 dict put restore globaldict /g get type", [Name(False, "dicttype")]),
+        ("true setglobal 1 array false setglobal dup 0 [2] putinterval 0 get", [2]),
+        ("/a [1 2] def save a 0 99 put true setglobal restore a 0 get", [1]),
+        # Local objects can hold global ones.
+        ("true setglobal [1] false setglobal 1 dict dup /a 4 -1 roll put /a get gcheck", [True]),
     ],
 )
 def test_evaluate(text, stack):
@@ -27,8 +46,25 @@ def test_evaluate(text, stack):
         ("save save exch restore restore", "invalidrestore"),
         ("save 10 dict exch restore", "invalidrestore"),
         ("save 10 dict begin restore", "invalidrestore"),
+        # setglobal
+        ("setglobal", "stackunderflow"),
+        ("1 setglobal", "typecheck"),
+        # Global objects can't hold local ones.
+        ("[1] true setglobal [ exch ]", "invalidaccess"),
+        ("[1] globaldict exch /a exch put", "invalidaccess"),
+        ("globaldict begin /a 1 dict def", "invalidaccess"),
+        ("true setglobal 1 array false setglobal 0 [2] put", "invalidaccess"),
+        ("true setglobal 1 array false setglobal 0 [[2]] putinterval", "invalidaccess"),
+        ("true setglobal 1 array false setglobal [[2]] exch copy", "invalidaccess"),
+        ("true setglobal 1 array false setglobal [2] exch astore", "invalidaccess"),
     ],
 )
 def test_evaluate_error(text, error):
     with pytest.raises(StiltedError, match=error):
         evaluate(text)
+
+
+def test_save_restore_gstack():
+    engine = Engine()
+    engine.exec_text("1 1 100 { pop save gsave restore } for")
+    assert engine.gstack == []
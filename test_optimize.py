@@ -0,0 +1,83 @@
+"""Tests of procedure optimization for Stilted."""
+
+import pytest
+
+from evaluate import Engine
+from test_helpers import compare_stacks
+
+
+def bound(text: str) -> str:
+    """Bind and fold the procedure `text`, and return it as `==` would."""
+    engine = Engine(fold_constants=True)
+    engine.exec_text(f"{text} bind")
+    return engine.ostack[-1].op_eqeq()
+
+
+@pytest.mark.parametrize(
+    "text, result",
+    [
+        ("{72 2 div}", "{36.0}"),
+        ("{moveto 1 2 add 3 mul}", "{--moveto-- 9}"),
+        ("{x 1 2 add}", "{x 3}"),
+        ("{1 2 exch sub neg}", "{-1}"),
+        ("{1 2 3 3 1 roll}", "{3 1 2}"),
+        ("{1 2 lt}", "{true}"),
+        ("{1 2 lt {(yes)} {(no)} ifelse}", "{(yes)}"),
+        ("{1 2 gt {(yes)} {(no)} ifelse}", "{(no)}"),
+        ("{true {1 2 add} if}", "{3}"),
+        ("{false {1 2 add} if 4}", "{4}"),
+        ("{{10 10 mul} repeat}", "{{100} --repeat--}"),
+        ("{x {1 1 add} {2 2 add} ifelse}", "{x {2} {4} --ifelse--}"),
+    ],
+)
+def test_folding(text, result):
+    assert bound(text) == result
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        # Errors have to happen when the procedure runs.
+        "{1 0 div}",
+        "{1 0 idiv}",
+        "{-1 sqrt}",
+        "{1 add}",
+        "{1 (a) add}",
+        # Side effects, or not pure.
+        "{rand 2 mul}",
+        "{1 2 3 count}",
+        "{10 string}",
+        # Allocation is observable.
+        "{[1 2 3]}",
+        # Not yet a constant condition.
+        "{x {1} if}",
+        # A literal array is data.
+        "[1 2 /add cvx]",
+    ],
+)
+def test_not_folded(text):
+    engine = Engine(fold_constants=True)
+    engine.exec_text(f"{text} dup bind")
+    assert engine.ostack[-1] is engine.ostack[-2]
+
+
+def test_redefined_true():
+    engine = Engine(fold_constants=True)
+    engine.exec_text("/true false def {true {1} if} bind")
+    assert engine.ostack[-1].op_eqeq() == "{true {1} --if--}"
+
+
+def test_no_folding_by_default():
+    engine = Engine()
+    engine.exec_text("{72 2 div} bind")
+    assert engine.ostack[-1].op_eqeq() == "{72 2 --div--}"
+
+
+def test_folded_results():
+    engine = Engine(fold_constants=True)
+    engine.exec_text("""
+        /inch { 72 mul } bind def
+        /f { 1 2 add 2 exp 3 inch add 2 1 gt { 1 add } if } bind def
+        f
+        """)
+    compare_stacks(engine.ostack, [226])
@@ -0,0 +1,151 @@
+"""Tests of server.py for Stilted."""
+
+import io
+import json
+import threading
+
+import pytest
+
+from server import percentile, send_requests, RenderServer, WarmEngine
+
+
+@pytest.fixture
+def warm():
+    return WarmEngine.make()
+
+
+def test_jobs_are_isolated(warm):
+    assert warm.run_job("/x 17 def x =") == {"status": "ok", "output": "17\n"}
+    assert warm.run_job("/x where =") == {"status": "ok", "output": "false\n"}
+    assert warm.run_job("x") == {
+        "status": "error", "error": "undefined", "command": "x", "output": "",
+    }
+
+
+def test_strings_and_random_are_reset():
+    warm = WarmEngine.make(prologue="/buf (hello) def /proc { (inside) } def")
+    result = warm.run_job(
+        "buf 0 88 put product 0 88 put =string 0 88 put /proc load 0 get 0 88 put "
+        + "42 srand rand ="
+    )
+    seeded = result["output"]
+    result = warm.run_job("buf print ( ) print product print =string 0 get = proc print")
+    assert result["output"] == "hello Stilted0\ninside"
+    assert warm.run_job("rand =")["output"] != seeded
+
+
+def test_state_is_reset(warm):
+    warm.run_job("1 2 mark 3 10 dict begin 20 dict begin save save 5 setlinewidth gsave (oops) cvx exec")
+    result = warm.run_job("count = countdictstack = currentlinewidth =")
+    assert result == {"status": "ok", "output": "0\n2\n1.0\n"}
+    assert len(warm.engine.estack) == 0
+    assert len(warm.engine.sstack) == 2
+    assert len(warm.engine.gstack) == 1
+
+
+def test_quit_ends_the_job(warm):
+    assert warm.run_job("(a) print quit (b) print") == {"status": "quit", "output": "a"}
+    assert warm.run_job("{ (c) print quit } loop") == {"status": "quit", "output": "c"}
+    assert warm.run_job("(d) print") == {"status": "ok", "output": "d"}
+
+
+def test_stop(warm):
+    assert warm.run_job("stop") == {"status": "error", "error": "stop", "output": ""}
+
+
+def test_prologue():
+    warm = WarmEngine.make(prologue="/double { 2 mul } def")
+    assert warm.run_job("/double { 3 mul } def 7 double =")["output"] == "21\n"
+    assert warm.run_job("21 double =")["output"] == "42\n"
+
+
+def test_outfile(warm, tmp_path):
+    draw = "0 0 moveto 100 100 lineto stroke showpage "
+    warm.run_job(draw * 2, str(tmp_path / "one%d.svg"))
+    warm.run_job(draw, str(tmp_path / "two.png"))
+    warm.run_job(draw * 3, None)
+    warm.run_job(draw, str(tmp_path / "three%d.svg"))
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "one1.svg", "one2.svg", "three1.svg", "two.png",
+    ]
+
+
+def test_outfile_matrix(warm, tmp_path):
+    # Devices have different default matrices, and the warm engine's matrix
+    # follows the device it is drawing on.
+    def ctm(warm, ext):
+        job = "matrix currentmatrix { = } forall 2 2 scale "
+        outfile = ext and str(tmp_path / f"page.{ext}")
+        return [float(num) for num in warm.run_job(job, outfile)["output"].split()]
+
+    fresh = {ext: ctm(WarmEngine.make(), ext) for ext in ["svg", "png", None]}
+    assert fresh["svg"] != pytest.approx(fresh["png"])
+    for ext in ["png", "svg", "png", None, "png", None, "svg"]:
+        assert ctm(warm, ext) == pytest.approx(fresh[ext])
+
+
+def test_percentile():
+    values = [5, 1, 4, 2, 3]
+    assert percentile(values, 50) == 3
+    assert percentile(values, 90) == 5
+    assert percentile(values, 0) == 1
+    assert percentile(range(1, 101), 99) == 99
+
+
+def test_render_server():
+    server = RenderServer(n_engines=2)
+    assert server.stats() == {"engines": 2, "jobs": 0, "queue_depth": 0}
+    assert server.handle({"id": 1, "code": "3 4 add ="})["output"] == "7\n"
+    assert server.handle({"id": 2, "code": "quit"})["status"] == "quit"
+    stats = server.handle({"id": "s", "op": "stats"})
+    assert stats["id"] == "s"
+    assert stats["jobs"] == 2
+    assert stats["queue_depth"] == 0
+    assert set(stats["latency_ms"]) == {"p50", "p90", "p99"}
+
+
+def test_render_file(tmp_path):
+    (tmp_path / "job.ps").write_text("(from a file) print")
+    server = RenderServer()
+    assert server.handle({"file": str(tmp_path / "job.ps")})["output"] == "from a file"
+    assert server.handle({"file": str(tmp_path / "nope.ps")})["status"] == "badrequest"
+    assert server.handle({})["status"] == "badrequest"
+    assert server.handle({"op": "dance"})["status"] == "badrequest"
+
+
+def test_serve_lines():
+    requests = [
+        {"id": n, "code": f"0 1 1 {n * 100} {{ add }} for ="} for n in range(10)
+    ]
+    infile = io.StringIO(
+        "\n".join(json.dumps(r) for r in requests) + "\n\n[1, 2]\n"
+    )
+    outfile = io.StringIO()
+    server = RenderServer(n_engines=3)
+    server.serve_lines(infile, outfile)
+    responses = [json.loads(line) for line in outfile.getvalue().splitlines()]
+    assert len(responses) == 11
+    assert [r["status"] for r in responses if "id" not in r] == ["badrequest"]
+    outputs = {r["id"]: r["output"] for r in responses if "id" in r}
+    assert outputs == {n: f"{n * 100 * (n * 100 + 1) // 2}\n" for n in range(10)}
+
+
+def test_socket(tmp_path):
+    path = str(tmp_path / "stilted.sock")
+    render_server = RenderServer(n_engines=2)
+    with render_server.socket_server(path) as server:
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            responses = send_requests(
+                path,
+                {"id": 1, "code": "/x 5 def x ="},
+                {"id": 2, "code": "x ="},
+                {"id": 3, "op": "stats"},
+            )
+        finally:
+            server.shutdown()
+            thread.join()
+    assert responses[0] == {"id": 1, "status": "ok", "output": "5\n", "seconds": responses[0]["seconds"]}
+    assert responses[1]["error"] == "undefined"
+    assert responses[2]["jobs"] == 2
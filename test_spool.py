@@ -0,0 +1,172 @@
+"""Tests of spool.py for Stilted."""
+
+import json
+import os
+import time
+
+from spool import run_workers, SpoolWorker
+
+
+DRAW = "0 0 moveto 100 100 lineto stroke showpage "
+
+
+def read_record(spool, job_name):
+    return json.loads((spool / "done" / f"{job_name}.json").read_text())
+
+
+def test_run_one(tmp_path):
+    (tmp_path / "two.ps").write_text(DRAW * 2 + "(hello) print")
+    worker = SpoolWorker(tmp_path, worker_id="w1")
+    record = worker.run_one()
+    assert record is not None
+    assert record["status"] == "ok"
+    assert record["output"] == "hello"
+    assert record["pages"] == ["two-1.svg", "two-2.svg"]
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == ["two-1.svg", "two-2.svg"]
+    assert record == read_record(tmp_path, "two.ps")
+    assert (tmp_path / "done" / "two.ps").exists()
+    assert list(tmp_path.glob("*.ps")) == []
+    assert list((tmp_path / "claimed").iterdir()) == []
+    assert worker.run_one() is None
+
+
+def test_jobs_are_isolated(tmp_path):
+    (tmp_path / "a.ps").write_text("/x 1 def 1 2 3 x =")
+    (tmp_path / "b.ps").write_text("count = x")
+    (tmp_path / "c.ps").write_text("(c) print quit")
+    worker = SpoolWorker(tmp_path)
+    assert worker.run(once=True) == 3
+    assert read_record(tmp_path, "a.ps")["output"] == "1\n"
+    b_record = read_record(tmp_path, "b.ps")
+    assert b_record["status"] == "error"
+    assert b_record["error"] == "undefined"
+    assert b_record["output"] == "0\n"
+    assert read_record(tmp_path, "c.ps")["status"] == "quit"
+
+
+def test_outdir_and_format(tmp_path):
+    (tmp_path / "spool").mkdir()
+    (tmp_path / "spool" / "pic.ps").write_text(DRAW)
+    worker = SpoolWorker(tmp_path / "spool", outdir=tmp_path / "pngs", format="png")
+    record = worker.run_one()
+    assert record is not None
+    assert record["pages"] == ["pic-1.png"]
+    assert (tmp_path / "pngs" / "pic-1.png").exists()
+
+
+def test_claim_once(tmp_path):
+    (tmp_path / "job.ps").write_text(DRAW)
+    worker1 = SpoolWorker(tmp_path, worker_id="w1")
+    worker2 = SpoolWorker(tmp_path, worker_id="w2")
+    claimed = worker1.claim()
+    assert claimed == tmp_path / "claimed" / "job.ps@w1"
+    assert worker2.claim() is None
+
+
+def test_reclaim_expired(tmp_path):
+    (tmp_path / "job.ps").write_text(DRAW)
+    crashed = SpoolWorker(tmp_path, worker_id="crashed", lease=10)
+    claimed = crashed.claim()
+    assert claimed is not None
+
+    worker = SpoolWorker(tmp_path, worker_id="w2", lease=10)
+    # The lease hasn't run out yet.
+    assert worker.claim() is None
+    long_ago = time.time() - 60
+    os.utime(claimed, (long_ago, long_ago))
+    record = worker.run_one()
+    assert record is not None
+    assert record["worker"] == "w2"
+    assert read_record(tmp_path, "job.ps")["worker"] == "w2"
+
+    # The first worker comes back to life, but its job is gone.
+    record = crashed.render(claimed)
+    assert record["status"] == "reclaimed"
+    assert read_record(tmp_path, "job.ps")["worker"] == "w2"
+    assert sorted(p.name for p in (tmp_path / "done").iterdir()) == ["job.ps", "job.ps.json"]
+    assert [p.name for p in (tmp_path / "out").iterdir()] == ["job-1.svg"]
+
+
+def test_reclaim_keeps_new_job(tmp_path):
+    (tmp_path / "job.ps").write_text("(old) print")
+    crashed = SpoolWorker(tmp_path, worker_id="crashed", lease=10)
+    claimed = crashed.claim()
+    assert claimed is not None
+    os.utime(claimed, (0, 0))
+    # A new job with the same name is spooled before the old one is reclaimed.
+    (tmp_path / "job.ps").write_text("(new) print")
+
+    worker = SpoolWorker(tmp_path, worker_id="w2", lease=10)
+    record = worker.run_one()
+    assert record is not None
+    assert record["output"] == "new"
+    record = worker.run_one()
+    assert record is not None
+    assert record["output"] == "old"
+    assert worker.run_one() is None
+
+
+def test_lost_lease_discards_pages(tmp_path, monkeypatch):
+    (tmp_path / "job.ps").write_text(DRAW)
+    slow = SpoolWorker(tmp_path, worker_id="slow", lease=10)
+    fast = SpoolWorker(tmp_path, worker_id="fast", lease=10)
+    claimed = slow.claim()
+    assert claimed is not None
+    real_run_job = slow.warm.run_job
+
+    def run_job(code, outfile):
+        # While the slow worker renders, its lease runs out, and the fast
+        # worker takes the job.
+        os.utime(claimed, (0, 0))
+        record = fast.run_one()
+        assert record is not None
+        assert record["pages"] == ["job-1.svg"]
+        return real_run_job(DRAW * 3, outfile)
+
+    monkeypatch.setattr(slow.warm, "run_job", run_job)
+    record = slow.render(claimed)
+    assert record["status"] == "reclaimed"
+    assert [p.name for p in (tmp_path / "out").iterdir()] == ["job-1.svg"]
+    assert read_record(tmp_path, "job.ps")["worker"] == "fast"
+
+
+def test_stale_pages_replaced(tmp_path):
+    worker = SpoolWorker(tmp_path)
+    (tmp_path / "job.ps").write_text(DRAW * 3)
+    record = worker.run_one()
+    assert record is not None
+    assert record["pages"] == ["job-1.svg", "job-2.svg", "job-3.svg"]
+    (tmp_path / "job.ps").write_text(DRAW)
+    record = worker.run_one()
+    assert record is not None
+    assert record["pages"] == ["job-1.svg"]
+    assert [p.name for p in (tmp_path / "out").iterdir()] == ["job-1.svg"]
+
+
+def test_heartbeat(tmp_path):
+    (tmp_path / "slow.ps").write_text("0 1 1 100000 { add } for =")
+    worker = SpoolWorker(tmp_path, lease=0.2)
+    claimed = worker.claim()
+    assert claimed is not None
+    os.utime(claimed, (0, 0))
+    with worker.heartbeat(claimed):
+        time.sleep(0.2)
+    assert time.time() - claimed.stat().st_mtime < 1
+
+
+def test_pages(tmp_path):
+    worker = SpoolWorker(tmp_path)
+    for name in ["a-1.svg", "a-10.svg", "a-2.svg", "a-b-1.svg", "a-1.png", "ab-1.svg"]:
+        (worker.outdir / name).write_text("")
+    assert worker.pages(worker.outdir, "a") == ["a-1.svg", "a-2.svg", "a-10.svg"]
+
+
+def test_run_workers(tmp_path):
+    for n in range(12):
+        (tmp_path / f"job{n:02d}.ps").write_text(f"{n} = " + DRAW)
+    counts = run_workers(3, once=True, spool=str(tmp_path))
+    assert sum(counts) == 12
+    for n in range(12):
+        record = read_record(tmp_path, f"job{n:02d}.ps")
+        assert record["output"] == f"{n}\n"
+        assert record["pages"] == [f"job{n:02d}-1.svg"]
@@ -1,16 +1,18 @@
 """Utilities for Stilted."""
 
 import math
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
 
 from error import Tilted
 
 def rangecheck(lo: float, val: float, hi: float | None=None) -> None:
     """Check that `lo <= val` and `val <= hi`."""
     if not (lo <= val):
-        raise Tilted("rangecheck", f"need {lo} <= {val}")
+        raise Tilted("rangecheck", "need {} <= {}", lo, val)
     if hi is not None:
         if not (val <= hi):
-            raise Tilted("rangecheck", f"need {val} <= {hi}")
+            raise Tilted("rangecheck", "need {} <= {}", val, hi)
 
 
 def clamp(lo: float, val: float, hi: float) -> float:
@@ -26,3 +28,33 @@ def clamp(lo: float, val: float, hi: float) -> float:
 def deg_to_rad(degrees: float) -> float:
     """Convert degrees to radians."""
     return math.pi * degrees / 180
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+class LruCache(Generic[K, V]):
+    """A mapping that keeps only the `maxsize` most recently used entries."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.data: OrderedDict[K, V] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def get(self, key: K) -> V | None:
+        """Get the value for `key`, or None if it isn't in the cache."""
+        value = self.data.get(key)
+        if value is not None:
+            self.data.move_to_end(key)
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        """Add `value` for `key`, evicting the least recently used if needed."""
+        if self.maxsize <= 0:
+            return
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)